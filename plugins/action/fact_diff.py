@@ -9,7 +9,7 @@ from ansible.module_utils._text import to_bytes
 from ansible.errors import AnsibleModuleError
 from ansible.plugins.callback import CallbackBase
 from ansible_collections.cidrblock.dev.plugins.module_utils.dot_utils import (
-    to_dotted,
+    iter_dotted,
 )
 
 ARGSPEC = {
@@ -66,8 +66,10 @@ class ActionModule(ActionBase):
 
     def _dotme(self):
         if self._task.args.get("dotted"):
-            self._before = to_dotted(self._before)
-            self._after = to_dotted(self._after)
+            # each flat dict is filled straight from the walk, and replaces
+            # the only reference the plugin holds to the nested value
+            self._before = dict(iter_dotted(self._before))
+            self._after = dict(iter_dotted(self._after))
 
     def run(self, tmp=None, task_vars=None):
         self._task.diff = True
@@ -0,0 +1,48 @@
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import os
+
+from ansible.module_utils._text import to_text
+from ansible_collections.ansible.netcommon.plugins.action.netconf import (
+    ActionModule as ActionNetconfModule,
+)
+from ansible_collections.cidrblock.dev.plugins.module_utils.xml_utils import (
+    is_xml_path,
+)
+
+
+class ActionModule(ActionNetconfModule):
+    """action module"""
+
+    def _handle_running_config_option(self):
+        """Resolve a running_config path to an absolute path on the
+        controller
+
+        The file is read by the module, which runs on the controller.
+        Relative paths are resolved against the playbook or role directory,
+        as netconf_get resolves dest, so a snapshot it wrote can be given
+        with the same path.
+
+        :return: An error message when the file does not exist, or None
+        """
+        running_config = self._task.args["running_config"]
+        if not isinstance(running_config, str):
+            return None
+        if not running_config.strip() or running_config.lstrip()[0] == "<":
+            return None
+        path = os.path.expanduser(os.path.expandvars(running_config))
+        if not os.path.isabs(path):
+            path = os.path.join(self._get_working_path(), path)
+        if not is_xml_path(path):
+            return "running_config file not found: %s" % path
+        self._task.args["running_config"] = path
+        return None
+
+    def run(self, tmp=None, task_vars=None):
+        if self._task.args.get("running_config") is not None:
+            error = self._handle_running_config_option()
+            if error:
+                return {"failed": True, "msg": to_text(error)}
+        return super(ActionModule, self).run(tmp=tmp, task_vars=task_vars)
@@ -0,0 +1,61 @@
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import os
+
+from ansible.module_utils._text import to_text
+from ansible_collections.ansible.netcommon.plugins.action.netconf import (
+    ActionModule as ActionNetconfModule,
+)
+
+DEFAULT_SNAPSHOT_DIR = "~/.ansible/netconf_snapshots"
+
+
+class ActionModule(ActionNetconfModule):
+    """action module"""
+
+    def _handle_dest_option(self):
+        """Resolve dest to an absolute path on the controller
+
+        A NETCONF module runs on the controller, so the module writes the
+        reply to dest itself and the reply never passes through the task
+        result. Relative paths are resolved against the playbook or role
+        directory here and missing directories created.
+        """
+        dest = os.path.expanduser(os.path.expandvars(self._task.args["dest"]))
+        if not os.path.isabs(dest):
+            dest = os.path.join(self._get_working_path(), dest)
+        dirname = os.path.dirname(dest)
+        if not os.path.isdir(dirname):
+            os.makedirs(dirname)
+        self._task.args["dest"] = dest
+
+    def _handle_snapshot_dir_option(self, task_vars):
+        """Resolve the snapshot directory of the host
+
+        Each inventory host gets a directory of its own below snapshot_dir,
+        which defaults to ~/.ansible/netconf_snapshots, so the module only
+        sees the directory of the host it talks to.
+        """
+        snapshot_dir = os.path.expanduser(
+            os.path.expandvars(
+                self._task.args.get("snapshot_dir") or DEFAULT_SNAPSHOT_DIR
+            )
+        )
+        if not os.path.isabs(snapshot_dir):
+            snapshot_dir = os.path.join(self._get_working_path(), snapshot_dir)
+        self._task.args["snapshot_dir"] = os.path.join(
+            snapshot_dir, task_vars.get("inventory_hostname", "localhost")
+        )
+
+    def run(self, tmp=None, task_vars=None):
+        task_vars = task_vars or {}
+        try:
+            if self._task.args.get("dest"):
+                self._handle_dest_option()
+            if self._task.args.get("snapshot", "never") != "never":
+                self._handle_snapshot_dir_option(task_vars)
+        except (IOError, OSError) as exc:
+            return {"failed": True, "msg": to_text(exc)}
+        return super(ActionModule, self).run(tmp=tmp, task_vars=task_vars)
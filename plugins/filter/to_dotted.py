@@ -3,12 +3,15 @@ from __future__ import absolute_import, division, print_function
 __metaclass__ = type
 
 from ansible.errors import AnsibleFilterError
+from ansible.module_utils._text import to_native
 from ansible.module_utils.common._collections_compat import (
     Mapping,
     MutableMapping,
 )
 
 from ansible_collections.cidrblock.dev.plugins.module_utils.dot_utils import (
+    DottedIndex,
+    from_dotted,
     to_dotted,
 )
 
@@ -17,8 +20,53 @@ def dotme(obj):
     return to_dotted(obj)
 
 
+def undotme(obj):
+    filter_name = "from_dotted"
+    if not isinstance(obj, (dict, Mapping, MutableMapping)):
+        msg = "The value passed to {filter_name} is required to be a dictionary".format(
+            filter_name=filter_name
+        )
+        raise AnsibleFilterError(msg)
+    try:
+        return from_dotted(obj)
+    except ValueError as exc:
+        msg = "Error in the '{filter_name}' filter plugin: {err}".format(
+            filter_name=filter_name, err=to_native(exc)
+        )
+        raise AnsibleFilterError(msg)
+
+
+# The index for the most recently selected dict, so repeated selects
+# against the same flattened fact only sort the paths once
+_INDEX = {"source": None, "index": None}
+
+
+def _index(obj):
+    if _INDEX["source"] is not obj or len(_INDEX["index"]) != len(obj):
+        _INDEX["source"] = obj
+        _INDEX["index"] = DottedIndex(obj)
+    return _INDEX["index"]
+
+
+def dotted_select(obj, prefix):
+    filter_name = "dotted_select"
+    if not isinstance(obj, (dict, Mapping, MutableMapping)):
+        msg = "The value passed to {filter_name} is required to be a dictionary".format(
+            filter_name=filter_name
+        )
+        raise AnsibleFilterError(msg)
+    index = _index(obj)
+    if isinstance(prefix, list):
+        return dict((entry, index.select(entry)) for entry in prefix)
+    return index.select(prefix)
+
+
 class FilterModule(object):
     """ Network filter """
 
     def filters(self):
-        return {"to_dotted": dotme}
+        return {
+            "to_dotted": dotme,
+            "from_dotted": undotme,
+            "dotted_select": dotted_select,
+        }
@@ -2,11 +2,27 @@ from __future__ import absolute_import, division, print_function
 
 __metaclass__ = type
 
+import fcntl
+import hashlib
+import io
 import json
+import os
+import tempfile
+from ansible import constants as C
 from ansible.errors import AnsibleFilterError
-from ansible.module_utils._text import to_native
+from ansible.module_utils._text import to_bytes, to_native
 from ansible.module_utils.basic import missing_required_lib
-
+from ansible_collections.cidrblock.dev.plugins.module_utils.xml_utils import (
+    HAS_LXML,
+    XML_PARSER,
+    iter_chunks,
+    iter_xml,
+    iter_xml_dotted,
+    iter_xml_items,
+    parse_xml,
+    select_xml,
+    write_xml,
+)
 
 try:
     import xmltodict
@@ -15,6 +31,17 @@ try:
 except ImportError:
     HAS_XMLTODICT = False
 
+# Parsed documents are kept as JSON files named by the sha256 of the
+# XML, read from the file when a path is given, and whether namespaces
+# were stripped. Task arguments are templated in a forked worker for
+# each host, so the cache is a directory the workers share, holding the
+# most recently used documents and the hit and miss counters. It is
+# created in the local temporary directory of the run, as the AnsiballZ
+# cache is, which ansible-playbook creates at startup for each run and
+# removes when it exits.
+CACHE_DIR = "from_xml_cache"
+CACHE_SIZE = 32
+
 
 def _check_reqs(filter_name):
     if not HAS_XMLTODICT:
@@ -24,16 +51,169 @@ def _check_reqs(filter_name):
         raise AnsibleFilterError(msg)
 
 
-def from_xml(obj):
-    filter_name = "from_xml"
-    _check_reqs(filter_name)
+def _check_bool(filter_name, name, value):
+    if not isinstance(value, bool):
+        msg = "The value passed to {filter_name} for '{name}' is required to be a boolean".format(
+            filter_name=filter_name, name=name
+        )
+        raise AnsibleFilterError(msg)
+
+
+def _stream_items(obj, item_depth, strip_namespaces, filter_name):
     try:
-        dyct = xmltodict.parse(obj, dict_constructor=dict)
+        for item in iter_xml_items(obj, item_depth, strip_namespaces):
+            yield item
     except Exception as exc:
-        msg = "'xmltodict' returned the following error in the '{filter_name}' filter plugin: {err}".format(
+        msg = "Parsing XML returned the following error in the '{filter_name}' filter plugin: {err}".format(
             filter_name=filter_name, err=to_native(exc)
         )
         raise AnsibleFilterError(msg)
+
+
+def _cache_path():
+    return os.path.join(C.DEFAULT_LOCAL_TMP, CACHE_DIR)
+
+
+def _cache_dir():
+    directory = _cache_path()
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    return directory
+
+
+def _read_stats(fhand):
+    try:
+        stats = json.load(fhand)
+        return {"hits": int(stats["hits"]), "misses": int(stats["misses"])}
+    except (ValueError, KeyError, TypeError):
+        return {"hits": 0, "misses": 0}
+
+
+def _count(directory, outcome):
+    """ Add a hit or a miss to the counters, the file is locked while it
+    is updated, so workers can count at the same time
+    """
+    fdesc = os.open(
+        os.path.join(directory, "stats"), os.O_RDWR | os.O_CREAT, 0o600
+    )
+    with os.fdopen(fdesc, "r+") as fhand:
+        fcntl.lockf(fhand, fcntl.LOCK_EX)
+        stats = _read_stats(fhand)
+        stats[outcome] += 1
+        fhand.seek(0)
+        fhand.truncate()
+        json.dump(stats, fhand)
+
+
+def _evict(directory):
+    """ Remove the least recently used documents beyond CACHE_SIZE """
+    entries = []
+    for name in os.listdir(directory):
+        if name.endswith(".json"):
+            path = os.path.join(directory, name)
+            try:
+                entries.append((os.stat(path).st_mtime, path))
+            except OSError:
+                pass
+    for _mtime, path in sorted(entries)[:-CACHE_SIZE]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _cached_parse(obj, strip_namespaces):
+    sha256 = hashlib.sha256()
+    for chunk in iter_chunks(obj):
+        sha256.update(to_bytes(chunk))
+    name = sha256.hexdigest()
+    if strip_namespaces:
+        name += "-stripped"
+    try:
+        directory = _cache_dir()
+    except (IOError, OSError):
+        return parse_xml(obj, strip_namespaces=strip_namespaces)
+    path = os.path.join(directory, name + ".json")
+    try:
+        with open(path) as fhand:
+            dyct = json.load(fhand)
+        os.utime(path, None)
+        _count(directory, "hits")
+        return dyct
+    except (IOError, OSError, ValueError):
+        pass
+
+    dyct = parse_xml(obj, strip_namespaces=strip_namespaces)
+    tmp_path = None
+    try:
+        _count(directory, "misses")
+        fdesc, tmp_path = tempfile.mkstemp(dir=directory, prefix=".from_xml")
+        with os.fdopen(fdesc, "w") as fhand:
+            json.dump(dyct, fhand)
+        os.rename(tmp_path, path)
+        _evict(directory)
+    except (IOError, OSError):
+        pass
+    finally:
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return dyct
+
+
+def from_xml_cache_info(obj=None):
+    """ The hit and miss counters of the from_xml cache, for every worker
+    of this run
+    """
+    directory = _cache_path()
+    try:
+        with open(os.path.join(directory, "stats")) as fhand:
+            fcntl.lockf(fhand, fcntl.LOCK_SH)
+            stats = _read_stats(fhand)
+    except (IOError, OSError):
+        stats = {"hits": 0, "misses": 0}
+    try:
+        size = len(
+            [name for name in os.listdir(directory) if name.endswith(".json")]
+        )
+    except OSError:
+        size = 0
+    return {
+        "hits": stats["hits"],
+        "misses": stats["misses"],
+        "size": size,
+        "maxsize": CACHE_SIZE,
+    }
+
+
+def from_xml(obj, item_depth=None, cache=False, strip_namespaces=False):
+    filter_name = "from_xml"
+    _check_bool(filter_name, "cache", cache)
+    _check_bool(filter_name, "strip_namespaces", strip_namespaces)
+    if item_depth is not None:
+        if not isinstance(item_depth, int) or item_depth < 1:
+            msg = "The value passed to {filter_name} for 'item_depth' is required to be a positive integer".format(
+                filter_name=filter_name
+            )
+            raise AnsibleFilterError(msg)
+        if not HAS_LXML:
+            _check_reqs(filter_name)
+        # Ansible turns a generator returned by a filter into a list, so
+        # all the items are held, only the element tree is never whole
+        return list(
+            _stream_items(obj, item_depth, strip_namespaces, filter_name)
+        )
+    if not HAS_LXML:
+        _check_reqs(filter_name)
+    try:
+        if cache:
+            dyct = _cached_parse(obj, strip_namespaces)
+        else:
+            dyct = parse_xml(obj, strip_namespaces=strip_namespaces)
+    except Exception as exc:
+        msg = "'{parser}' returned the following error in the '{filter_name}' filter plugin: {err}".format(
+            parser=XML_PARSER, filter_name=filter_name, err=to_native(exc)
+        )
+        raise AnsibleFilterError(msg)
     try:
         return dyct
     except Exception as exc:
@@ -43,9 +223,51 @@ def from_xml(obj):
         raise AnsibleFilterError(msg)
 
 
-def to_xml(obj, full_doc=False, pretty=False):
+def from_xml_dotted(obj, strip_namespaces=False):
+    filter_name = "from_xml_dotted"
+    _check_bool(filter_name, "strip_namespaces", strip_namespaces)
+    if not HAS_LXML:
+        _check_reqs(filter_name)
+    try:
+        return dict(iter_xml_dotted(obj, strip_namespaces=strip_namespaces))
+    except Exception as exc:
+        msg = "Parsing XML returned the following error in the '{filter_name}' filter plugin: {err}".format(
+            filter_name=filter_name, err=to_native(exc)
+        )
+        raise AnsibleFilterError(msg)
+
+
+def xml_select(obj, path, namespaces=None, strip_namespaces=False):
+    filter_name = "xml_select"
+    if not isinstance(path, str):
+        msg = "The value passed to {filter_name} for 'path' is required to be a string".format(
+            filter_name=filter_name
+        )
+        raise AnsibleFilterError(msg)
+    if namespaces is not None and not isinstance(namespaces, dict):
+        msg = "The value passed to {filter_name} for 'namespaces' is required to be a dictionary".format(
+            filter_name=filter_name
+        )
+        raise AnsibleFilterError(msg)
+    _check_bool(filter_name, "strip_namespaces", strip_namespaces)
+    if not HAS_LXML:
+        _check_reqs(filter_name)
+    try:
+        return select_xml(
+            obj,
+            path,
+            namespaces=namespaces,
+            strip_namespaces=strip_namespaces,
+        )
+    except Exception as exc:
+        msg = "Selecting from XML returned the following error in the '{filter_name}' filter plugin: {err}".format(
+            filter_name=filter_name, err=to_native(exc)
+        )
+        raise AnsibleFilterError(msg)
+
+
+def to_xml(obj, full_doc=False, pretty=False, dest=None):
     filter_name = "to_xml"
-    _check_reqs(filter_name)
 
     errors = []
     for param in [full_doc, pretty]:
@@ -63,11 +285,20 @@ def to_xml(obj, full_doc=False, pretty=False):
         )
         raise AnsibleFilterError(msg)
 
+    if dest is not None and not isinstance(dest, str):
+        msg = "The value passed to {filter_name} for 'dest' is required to be a path".format(
+            filter_name=filter_name
+        )
+        raise AnsibleFilterError(msg)
+
     try:
-        xmlstr = xmltodict.unparse(obj, full_document=full_doc, pretty=pretty)
-        return xmlstr
+        if dest is None:
+            return "".join(iter_xml(obj, full_doc=full_doc, pretty=pretty))
+        with io.open(dest, "w", encoding="utf-8") as fhand:
+            write_xml(obj, fhand, full_doc=full_doc, pretty=pretty)
+        return dest
     except Exception as exc:
-        msg = "'xmltodict' returned the following error in the '{filter_name}' filter plugin: {err}".format(
+        msg = "Serializing XML returned the following error in the '{filter_name}' filter plugin: {err}".format(
             filter_name=filter_name, err=to_native(exc)
         )
         raise AnsibleFilterError(msg)
@@ -77,4 +308,10 @@ class FilterModule(object):
     """ XML conversion filters """
 
     def filters(self):
-        return {"to_xml": to_xml, "from_xml": from_xml}
+        return {
+            "to_xml": to_xml,
+            "from_xml": from_xml,
+            "from_xml_dotted": from_xml_dotted,
+            "from_xml_cache_info": from_xml_cache_info,
+            "xml_select": xml_select,
+        }
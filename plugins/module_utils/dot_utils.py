@@ -2,28 +2,238 @@ from __future__ import absolute_import, division, print_function
 
 __metaclass__ = type
 
+from bisect import bisect_left
+
 from ansible.module_utils.common._collections_compat import (
     Mapping,
     MutableMapping,
 )
 
 
+def _is_mapping(val):
+    cls = val.__class__
+    if cls is dict:
+        return True
+    if cls is str or cls is list:
+        return False
+    return isinstance(val, (Mapping, MutableMapping))
+
+
+def _frame(data, name):
+    """ Build a stack frame for a container
+
+    The prefix for the children is built once here, so each child path
+    costs a single string concatenation.
+
+    :param data: A mapping or list
+    :param name: The dotted path of the container
+    :return: A tuple of (iterator, prefix, is_list)
+    """
+    if isinstance(data, list):
+        return enumerate(data), "{}[".format(name), True
+    prefix = "{}.".format(name) if name else ""
+    return iter(data.items()), prefix, False
+
+
+def iter_dotted(nested_json):
+    """ Lazily flatten a nested structure into (dotted path, value) pairs
+
+    The tree is walked depth first with an explicit stack rather than
+    recursion, so deeply nested YANG trees do not hit the recursion limit.
+    Pairs are yielded in the insertion order of the source structure.
+
+    :param nested_json: The nested structure to flatten
+    :type nested_json: dict or list
+    :return: A generator of (dotted path, leaf value) tuples
+    """
+    if not (isinstance(nested_json, list) or _is_mapping(nested_json)):
+        yield "", nested_json
+        return
+
+    stack = [_frame(nested_json, "")]
+    while stack:
+        items, prefix, is_list = stack[-1]
+        for k, val in items:
+            if is_list:
+                name = prefix + str(k) + "]"
+            elif not prefix:
+                name = k
+            elif k.__class__ is str:
+                name = prefix + k
+            else:
+                name = prefix + format(k)
+            if val.__class__ is list or _is_mapping(val):
+                stack.append(_frame(val, name))
+                break
+            yield name, val
+        else:
+            stack.pop()
+
+
 def to_dotted(nested_json):
-    out = {}
-
-    def flatten(data, name=""):
-        if isinstance(data, (dict, Mapping, MutableMapping)):
-            for k, val in data.items():
-                if name:
-                    nname = name + ".{}".format(k)
-                else:
-                    nname = k
-                flatten(val, nname)
-        elif isinstance(data, list):
-            for idx, val in enumerate(data):
-                flatten(val, "{}[{}]".format(name, idx))
+    """ Flatten a nested structure into a dict keyed by dotted path
+
+    :param nested_json: The nested structure to flatten
+    :type nested_json: dict or list
+    :return: A dict of dotted path to leaf value
+    :rtype: dict
+    """
+    return dict(iter_dotted(nested_json))
+
+
+class _Indexed(dict):
+    """ A list being assembled, keyed by index until it is sized """
+
+
+def _split(path):
+    """ Split a dotted path at its last segment
+
+    :param path: The dotted path
+    :type path: str
+    :return: A tuple of (parent path, key, is_index)
+    """
+    if not isinstance(path, str):
+        return "", path, False
+    pos = path.rfind(".")
+    bracket = path.rfind("[")
+    if bracket > pos:
+        pos = bracket
+    if pos == -1:
+        return "", path, False
+    if path[pos] == "[":
+        index = path[pos + 1 : -1]
+        if path[-1] != "]" or not index or index.strip("0123456789"):
+            raise ValueError(
+                "Malformed index in path '{}', expected a non-negative"
+                " integer".format(path)
+            )
+        return path[:pos], int(index), True
+    return path[:pos], path[pos + 1 :], False
+
+
+def _container(nodes, created, path, is_list):
+    """ Find or create the container at a path, creating any parents
+
+    :param nodes: The containers built so far keyed by path
+    :param created: The (parent, key, container) of every list placeholder
+    :param path: The dotted path of the container
+    :param is_list: True if the container is accessed by index
+    :return: The container
+    """
+    missing = []
+    while path not in nodes:
+        missing.append((path, is_list))
+        if not path:
+            break
+        path, _key, is_list = _split(path)
+    node = nodes.get(path)
+    if node is not None and isinstance(node, _Indexed) is not is_list:
+        raise ValueError(
+            "Path '{}' is used as both a list and a dictionary".format(path)
+        )
+    for path, is_list in reversed(missing):
+        child = _Indexed() if is_list else {}
+        if path:
+            _parent, key, _is_index = _split(path)
+            if key in node:
+                raise ValueError(
+                    "Path '{}' is both a value and a container".format(path)
+                )
+            node[key] = child
+        else:
+            node = None
+        if is_list:
+            created.append((node, key if path else None, child))
+        nodes[path] = node = child
+    return node
+
+
+def from_dotted(dotted):
+    """ Rebuild a nested structure from a dict keyed by dotted path
+
+    This is the inverse of to_dotted. Each path is split at its last
+    segment and the parent container is found by path, so every leaf is
+    placed in constant time. Lists are assembled by index and sized once
+    from the largest index seen, missing indices are filled with None.
+    Empty containers and keys containing '.' or '[' cannot be recovered.
+
+    :param dotted: A dict of dotted path to leaf value
+    :type dotted: dict
+    :return: The nested structure
+    :rtype: dict or list
+    """
+    if "" in dotted:
+        if len(dotted) != 1:
+            raise ValueError("An empty path can only be used on its own")
+        return dotted[""]
+
+    nodes = {}
+    created = []
+    for path, val in dotted.items():
+        parent, key, is_index = _split(path)
+        node = nodes.get(parent)
+        if node is None or (node.__class__ is _Indexed) is not is_index:
+            node = _container(nodes, created, parent, is_index)
+        if key in node:
+            raise ValueError(
+                "Path '{}' is both a value and a container".format(path)
+            )
+        node[key] = val
+
+    root = nodes.get("", {})
+    for parent, key, indexed in reversed(created):
+        sized = [None] * (max(indexed) + 1)
+        for idx, val in indexed.items():
+            sized[idx] = val
+        if parent is None:
+            root = sized
         else:
-            out[name] = data
+            parent[key] = sized
+    return root
+
+
+class DottedIndex(object):
+    """ A sorted index over the paths of a flattened structure
+
+    The paths of a to_dotted result are sorted once, after which the
+    leaves below any path are found with a bisect on either side of the
+    '.' and '[' separators, rather than testing every path.
+    """
+
+    def __init__(self, dotted):
+        """ Build the index
+
+        :param dotted: A dict of dotted path to leaf value
+        :type dotted: dict
+        """
+        self._dotted = dotted
+        order = [k for k in dotted if isinstance(k, str)]
+        self._ranks = sorted(range(len(order)), key=order.__getitem__)
+        self._keys = [order[rank] for rank in self._ranks]
+
+    def __len__(self):
+        return len(self._dotted)
+
+    def _span(self, start, stop):
+        """ The positions of the sorted paths from start up to stop """
+        lower = bisect_left(self._keys, start)
+        return range(lower, bisect_left(self._keys, stop, lower))
+
+    def select(self, prefix):
+        """ Select the leaves at or below a path
 
-    flatten(nested_json)
-    return out
+        :param prefix: The dotted path of the subtree
+        :type prefix: str
+        :return: A dict of dotted path to leaf value, in the original order
+        :rtype: dict
+        """
+        if not prefix:
+            return dict(self._dotted)
+        keys = self._keys
+        positions = list(self._span(prefix + ".", prefix + "/"))
+        positions.extend(self._span(prefix + "[", prefix + "\\"))
+        exact = bisect_left(keys, prefix)
+        if exact < len(keys) and keys[exact] == prefix:
+            positions.append(exact)
+        positions.sort(key=self._ranks.__getitem__)
+        return dict((keys[pos], self._dotted[keys[pos]]) for pos in positions)
@@ -0,0 +1,831 @@
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import copy
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+from contextlib import contextmanager
+
+try:
+    from lxml.etree import ElementTree, fromstring, tostring
+except ImportError:
+    from xml.etree.ElementTree import ElementTree, fromstring, tostring
+
+from ansible.errors import AnsibleModuleError
+from ansible.module_utils._text import to_bytes, to_text
+from ansible_collections.ansible.netcommon.plugins.module_utils.network.netconf.netconf import (
+    get_capabilities,
+)
+
+_clock = getattr(time, "perf_counter", time.time)
+
+BASE_NS = "urn:ietf:params:xml:ns:netconf:base:1.0"
+OPERATION = "{%s}operation" % BASE_NS
+
+
+def _socket_identity(socket_path):
+    """The inode and change time of the persistent connection socket,
+    which change when the connection is started again
+    """
+    stat = os.stat(socket_path)
+    return [stat.st_ino, stat.st_ctime]
+
+
+def _remove_stale_capabilities(directory):
+    """Remove the capabilities cached for connections whose socket is
+    gone, the socket path differs for every run
+    """
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return
+    for name in names:
+        if not name.endswith(".capabilities"):
+            continue
+        socket_path = os.path.join(directory, name[: -len(".capabilities")])
+        if os.path.exists(socket_path):
+            continue
+        try:
+            os.remove(os.path.join(directory, name))
+        except OSError:
+            pass
+
+
+def cached_capabilities(module, refresh=False):
+    """The capabilities of the NETCONF connection, cached for its lifetime
+
+    The capabilities from the server hello are written next to the
+    persistent connection socket, with the identity of the socket, so
+    later tasks for the host read them from disk rather than asking the
+    connection. A new connection has a new socket, which invalidates the
+    cache. Files left by connections whose socket no longer exists are
+    removed when the cache is written. The result is also set on the
+    module, where get_capabilities and get_connection look for it.
+
+    :param module: The AnsibleModule
+    :param refresh: Ask the connection even when the cache is current
+    :type refresh: bool
+    :return: The capabilities
+    :rtype: dict
+    """
+    if hasattr(module, "_netconf_capabilities"):
+        if not refresh:
+            return module._netconf_capabilities
+        del module._netconf_capabilities
+
+    cache_path = module._socket_path + ".capabilities"
+    try:
+        identity = _socket_identity(module._socket_path)
+    except (OSError, TypeError):
+        return get_capabilities(module)
+
+    if not refresh:
+        try:
+            with open(cache_path) as fhand:
+                cached = json.load(fhand)
+            if cached["socket"] == identity:
+                module._netconf_capabilities = cached["capabilities"]
+                return module._netconf_capabilities
+        except (OSError, IOError, ValueError, KeyError, TypeError):
+            pass
+
+    capabilities = get_capabilities(module)
+    _remove_stale_capabilities(os.path.dirname(cache_path))
+    try:
+        fdesc, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(cache_path), prefix=".capabilities"
+        )
+        with os.fdopen(fdesc, "w") as fhand:
+            json.dump(
+                {"socket": identity, "capabilities": capabilities}, fhand
+            )
+        os.rename(tmp_path, cache_path)
+    except (OSError, IOError):
+        pass
+    return capabilities
+
+
+def filter_type_of(tipe):
+    """The NETCONF filter type for the type from ensure_xml_or_str
+
+    :param tipe: 'xml', 'str' or None
+    :return: 'subtree', 'xpath' or None
+    """
+    if tipe == "xml":
+        return "subtree"
+    if tipe == "str":
+        return "xpath"
+    return tipe
+
+
+def _localname(tag):
+    return tag.rpartition("}")[2]
+
+
+def page_filters(root):
+    """Split a subtree filter into one filter per top-level container
+
+    Each page is the root element of the filter holding one of its child
+    elements, so the server replies with one container at a time.
+
+    :param root: The parsed subtree filter
+    :return: A list of filter strings, with a single page when the root
+        element selects less than two containers
+    :rtype: list
+    """
+    children = [child for child in root if isinstance(child.tag, str)]
+    if len(children) < 2:
+        return [to_text(tostring(root))]
+    extra = {}
+    if hasattr(root, "nsmap"):
+        extra["nsmap"] = root.nsmap
+    pages = []
+    for child in children:
+        page = root.makeelement(root.tag, dict(root.attrib), **extra)
+        child = copy.deepcopy(child)
+        child.tail = None
+        page.append(child)
+        pages.append(to_text(tostring(page)))
+    return pages
+
+
+def plan_filters(filters, paging=False):
+    """Group named filters into as few RPCs as possible
+
+    Subtree filters with different root elements are merged into one
+    <filter> element, which ncclient accepts as is, and the reply is
+    later split by root element. XPath filters and subtree filters with
+    a root element already in the merged filter, where the server would
+    merge the replies, get an RPC of their own.
+
+    When paging, nothing is merged and each subtree filter is split by
+    page_filters into an RPC for each of its top-level containers, the
+    replies being put back together with merge_reply.
+
+    :param filters: A list of (name, filter type, filter, root element)
+        tuples, the root element being the parsed subtree filter
+    :type filters: list
+    :param paging: Split subtree filters into pages
+    :type paging: bool
+    :return: A list of (filter spec, keys) tuples, keys being a list of
+        (name, root element) tuples, the root element None when the name
+        takes the whole reply
+    :rtype: list
+    """
+    merged = []
+    rpcs = []
+    seen = set()
+    for name, filter_type, filter, root in filters:
+        if paging and filter_type == "subtree" and root is not None:
+            for page in page_filters(root):
+                rpcs.append((("subtree", page), [(name, None)]))
+            continue
+        if filter_type == "subtree" and root is not None:
+            localname = _localname(root.tag)
+            if localname not in seen:
+                seen.add(localname)
+                merged.append((name, filter, root))
+                continue
+        spec = (filter_type, filter) if filter_type else None
+        rpcs.append((spec, [(name, None)]))
+    if len(merged) == 1:
+        name, filter, root = merged[0]
+        rpcs.insert(0, (("subtree", filter), [(name, None)]))
+    elif merged:
+        spec = '<filter type="subtree">{}</filter>'.format(
+            "".join(to_text(tostring(root)) for _name, _filter, root in merged)
+        )
+        rpcs.insert(
+            0, (spec, [(name, root) for name, _filter, root in merged])
+        )
+    return rpcs
+
+
+def _matches(elem, root):
+    tag = elem.tag
+    if not isinstance(tag, str):
+        return False
+    if root.tag[0] == "{":
+        return tag == root.tag
+    return _localname(tag) == root.tag
+
+
+def _data_element(response):
+    if _localname(response.tag) != "data":
+        for child in response:
+            if isinstance(child.tag, str) and _localname(child.tag) == "data":
+                return child
+    return response
+
+
+def split_reply(response, keys):
+    """Split the reply to a merged filter by the root element of each
+
+    Each name gets a copy of the <data> element holding only the elements
+    matching its filter root, moved rather than copied from the reply. A
+    filter without a namespace matches on the local name.
+
+    :param response: The reply element, <data> or an <rpc-reply> holding it
+    :param keys: A list of (name, root element) tuples from plan_filters
+    :type keys: list
+    :return: A dict of name to reply element
+    :rtype: dict
+    """
+    if len(keys) == 1 and keys[0][1] is None:
+        return {keys[0][0]: response}
+    data = _data_element(response)
+    extra = {}
+    if hasattr(data, "nsmap"):
+        extra["nsmap"] = data.nsmap
+    replies = {}
+    for name, root in keys:
+        reply = data.makeelement(data.tag, dict(data.attrib), **extra)
+        for child in [elem for elem in data if _matches(elem, root)]:
+            reply.append(child)
+        replies[name] = reply
+    return replies
+
+
+def merge_reply(response, page):
+    """Move the content of a page reply into the reply of earlier pages
+
+    The children of each top-level container in the page are appended to
+    the container with the same tag in the reply, a container the reply
+    does not have yet is moved as a whole.
+
+    :param response: The reply element the pages are merged into
+    :param page: The reply element of the next page
+    """
+    data = _data_element(response)
+    containers = dict(
+        (elem.tag, elem) for elem in data if isinstance(elem.tag, str)
+    )
+    for elem in list(_data_element(page)):
+        if not isinstance(elem.tag, str):
+            continue
+        container = containers.get(elem.tag)
+        if container is None:
+            data.append(elem)
+            containers[elem.tag] = elem
+        else:
+            for child in list(elem):
+                container.append(child)
+
+
+def content_scope(*configs):
+    """The top-level containers edit-config <config> elements touch
+
+    :param configs: The parsed <config> elements
+    :return: A tuple of (filter spec, roots), the subtree filter selecting
+        the containers and the containers as empty elements, or
+        (None, None) when the content has no containers
+    :rtype: tuple
+    """
+    roots = []
+    seen = set()
+    for root in configs:
+        for child in root:
+            if not isinstance(child.tag, str) or child.tag in seen:
+                continue
+            seen.add(child.tag)
+            extra = {}
+            if hasattr(child, "nsmap"):
+                extra["nsmap"] = child.nsmap
+            roots.append(child.makeelement(child.tag, {}, **extra))
+    if not roots:
+        return None, None
+    spec = '<filter type="subtree">{}</filter>'.format(
+        "".join(to_text(tostring(elem)) for elem in roots)
+    )
+    return spec, roots
+
+
+def scope_reply(response, roots):
+    """Narrow a full reply to the containers of content_scope, giving
+    what the server returns for the scope filter
+
+    :param response: The reply element, <data> or an <rpc-reply> holding it
+    :param roots: The roots from content_scope
+    :type roots: list
+    :return: A <data> element holding the matching containers, moved from
+        the reply
+    """
+    data = _data_element(response)
+    extra = {}
+    if hasattr(data, "nsmap"):
+        extra["nsmap"] = data.nsmap
+    scoped = data.makeelement(data.tag, dict(data.attrib), **extra)
+    for child in [
+        elem for elem in data if any(_matches(elem, root) for root in roots)
+    ]:
+        scoped.append(child)
+    return scoped
+
+
+def _text(elem):
+    text = elem.text
+    if text is None or not text.strip():
+        return ""
+    return text
+
+
+def _elements(elem):
+    return [child for child in elem if isinstance(child.tag, str)]
+
+
+def _same_tag(current, desired):
+    if desired.tag[0] == "{":
+        return current.tag == desired.tag
+    return _localname(current.tag) == desired.tag
+
+
+def _is_leaf(elem):
+    return not _elements(elem)
+
+
+class _Lists(object):
+    """Tells list entries apart and finds their keys
+
+    An element is a list entry when its name is in list_keys or when it
+    is repeated among its siblings in either tree. Nothing else tells a
+    list with one entry on each side from a container, so such lists
+    must be named in list_keys. The key of an entry is the text of the
+    leaves named in list_keys, otherwise of its first leaf, as RFC 7950
+    puts the keys of a list entry first, and the text of a leaf-list
+    entry.
+    """
+
+    def __init__(self, list_keys):
+        self._keys = list_keys or {}
+
+    def names(self, *siblings):
+        names = set(self._keys)
+        for elems in siblings:
+            seen = set()
+            for elem in elems:
+                name = _localname(elem.tag)
+                if name in seen:
+                    names.add(name)
+                seen.add(name)
+        return names
+
+    def key_leaves(self, entry):
+        children = _elements(entry)
+        names = self._keys.get(_localname(entry.tag))
+        if names:
+            return [
+                child for child in children if _localname(child.tag) in names
+            ]
+        if children and _is_leaf(children[0]):
+            return children[:1]
+        return []
+
+    def key(self, entry):
+        if _is_leaf(entry):
+            return _text(entry)
+        return tuple(
+            (_localname(leaf.tag), _text(leaf))
+            for leaf in self.key_leaves(entry)
+        )
+
+    def index(self, elems, names):
+        """The elements by local name and, for list entries, key"""
+        index = {}
+        for elem in elems:
+            index.setdefault(self.match_key(elem, names), []).append(elem)
+        return index
+
+    def match_key(self, elem, names):
+        name = _localname(elem.tag)
+        return name, self.key(elem) if name in names else None
+
+
+def _find(index, key, want):
+    """Take the first element of index matching want off its entry"""
+    found = index.get(key)
+    for pos, candidate in enumerate(found or ()):
+        if _same_tag(candidate, want):
+            return found.pop(pos)
+    return None
+
+
+def _edit_element(elem, attrib=None):
+    extra = {}
+    if hasattr(elem, "nsmap"):
+        extra["nsmap"] = elem.nsmap
+    return elem.makeelement(elem.tag, attrib or {}, **extra)
+
+
+def _copy(elem):
+    elem = copy.deepcopy(elem)
+    elem.tail = None
+    return elem
+
+
+def _diff_children(current, desired, edit, lists, prune, delete=True, sent=()):
+    """Add to edit what turns the children of current into those of
+    desired, True when anything was added besides the leaves in sent,
+    which are already in edit. prune is a pair of flags, deleting the
+    list entries and the other elements missing from desired.
+    """
+    current_children = _elements(current)
+    desired_children = _elements(desired)
+    list_names = lists.names(current_children, desired_children)
+    index = lists.index(current_children, list_names)
+    changed = False
+    matched = set()
+    for want in desired_children:
+        have = _find(index, lists.match_key(want, list_names), want)
+        if have is None:
+            edit.append(_copy(want))
+            changed = True
+            continue
+        matched.add(id(have))
+        if id(want) in sent:
+            changed = changed or _text(want) != _text(have)
+            continue
+        if _is_leaf(want) or _is_leaf(have):
+            if _text(want) != _text(have) or _is_leaf(want) != _is_leaf(have):
+                edit.append(_copy(want))
+                changed = True
+            continue
+        # the keys identify a list entry, sent for any element with children
+        # as a single entry of a list cannot be told from a container
+        sub = _edit_element(want)
+        keys = lists.key_leaves(want)
+        for leaf in keys:
+            sub.append(_copy(leaf))
+        if _diff_children(
+            have, want, sub, lists, prune, sent=set(id(leaf) for leaf in keys)
+        ):
+            edit.append(sub)
+            changed = True
+    if not delete:
+        return changed
+    prune_lists, prune_nodes = prune
+    for have in current_children:
+        if id(have) in matched:
+            continue
+        is_entry = _localname(have.tag) in list_names
+        if not (prune_lists if is_entry else prune_nodes):
+            continue
+        gone = _edit_element(have, {OPERATION: "delete"})
+        if is_entry:
+            if _is_leaf(have):
+                gone.text = have.text
+            for leaf in lists.key_leaves(have):
+                gone.append(_copy(leaf))
+        edit.append(gone)
+        changed = True
+    return changed
+
+
+def config_edit(
+    current, desired, list_keys=None, prune_lists=False, prune_nodes=False
+):
+    """The smallest <config> turning the current configuration into the
+    desired one with edit-config merge
+
+    Changed leaves, and subtrees missing from the current configuration,
+    are copied from desired, within their parents and, for list entries,
+    with the keys of the entry. Elements of the current configuration
+    missing from desired are kept, as desired is often read with a filter
+    selecting part of a container. They only get operation="delete" with
+    prune_lists for list entries and prune_nodes for leaves and
+    containers. Top-level containers are never deleted.
+
+    An element of desired without a namespace matches on the local name.
+
+    :param current: The <data> reply with the current configuration
+    :param desired: The desired <config> element
+    :param list_keys: A map of list name to the names of its key leaves,
+        for lists whose key is not their first leaf alone
+    :type list_keys: dict
+    :param prune_lists: Delete list entries missing from desired
+    :type prune_lists: bool
+    :param prune_nodes: Delete leaves and containers missing from desired
+    :type prune_nodes: bool
+    :return: The <config> element, None when nothing changes
+    """
+    extra = {}
+    if hasattr(desired, "nsmap"):
+        extra["nsmap"] = {"nc": BASE_NS}
+    edit = desired.makeelement(desired.tag, {}, **extra)
+    changed = _diff_children(
+        _data_element(current),
+        desired,
+        edit,
+        _Lists(list_keys),
+        (prune_lists, prune_nodes),
+        delete=False,
+    )
+    return edit if changed else None
+
+
+def _operation(elem, inherited):
+    return elem.get(OPERATION) or elem.get("operation") or inherited
+
+
+def _apply_children(parent, wanted, inherited, lists, path=""):
+    """Apply the config elements in wanted to the children of parent,
+    path being the location of parent for error messages
+    """
+    list_names = lists.names(_elements(parent), wanted)
+    index = lists.index(_elements(parent), list_names)
+    for want in wanted:
+        operation = _operation(want, inherited)
+        where = "%s/%s" % (path, _localname(want.tag))
+        key = lists.match_key(want, list_names)
+        have = _find(index, key, want)
+        if operation in ("delete", "remove"):
+            if have is not None:
+                parent.remove(have)
+            elif operation == "delete":
+                raise AnsibleModuleError(
+                    "data-missing: %s does not exist and cannot be deleted"
+                    % where
+                )
+            continue
+        if operation == "create" and have is not None:
+            raise AnsibleModuleError(
+                "data-exists: %s already exists and cannot be created" % where
+            )
+        if have is None and operation == "none":
+            raise AnsibleModuleError(
+                "data-missing: %s does not exist and default_operation is "
+                "none" % where
+            )
+        if have is None or operation == "replace":
+            new = _edit_element(want)
+            if _is_leaf(want):
+                new.text = want.text
+            if have is None:
+                parent.append(new)
+            else:
+                new.tail = have.tail
+                parent.replace(have, new)
+            _apply_children(new, _elements(want), "merge", lists, where)
+            have = new
+        elif _is_leaf(want):
+            if operation != "none":
+                for child in list(have):
+                    have.remove(child)
+                have.text = want.text
+        else:
+            _apply_children(have, _elements(want), operation, lists, where)
+        # a later element of the edit may change the same one again
+        index.setdefault(key, []).insert(0, have)
+
+
+def simulate_edit(current, config, default_operation=None, list_keys=None):
+    """Apply an edit-config <config> to a copy of the current configuration
+
+    The merge, replace, create, delete and remove operations of RFC 6241
+    are applied as the server would, from the operation attribute in the
+    base namespace or without a namespace, inherited by the children of
+    an element, and from default_operation elsewhere. List entries are
+    matched as in config_edit.
+
+    :param current: The <data> reply with the current configuration
+    :param config: The <config> element of the edit
+    :param default_operation: merge, replace or none, None for merge
+    :type default_operation: str
+    :param list_keys: A map of list name to the names of its key leaves
+    :type list_keys: dict
+    :return: The <data> element after the edit
+    :raises AnsibleModuleError: When the server would reject the edit,
+        with its error tag
+    """
+    data = copy.deepcopy(_data_element(current))
+    _apply_children(
+        data,
+        _elements(config),
+        default_operation or "merge",
+        _Lists(list_keys),
+    )
+    return data
+
+
+class _Digest(object):
+    """A binary file wrapper hashing and counting what is written,
+    without a file the data is only hashed
+    """
+
+    def __init__(self, fhand=None):
+        self._fhand = fhand
+        self.size = 0
+        self.sha256 = hashlib.sha256()
+
+    def write(self, data):
+        if self._fhand is not None:
+            self._fhand.write(data)
+        self.size += len(data)
+        self.sha256.update(data)
+
+    def flush(self):
+        if self._fhand is not None:
+            self._fhand.flush()
+
+
+def _file_sha256(path):
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as fhand:
+        for chunk in iter(lambda: fhand.read(1024 * 1024), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def write_reply(module, response, dest, compress=False):
+    """Write a reply element to a file as it is serialized
+
+    The tree is serialized by the XML library straight to a temporary
+    file next to dest, through gzip when compress is set, and only moved
+    into place when the content differs from an existing dest. The gzip
+    header has no timestamp, so the same reply gives the same file.
+
+    :param module: The AnsibleModule
+    :param response: The reply element
+    :param dest: The absolute path of the file
+    :type dest: str
+    :param compress: Compress the file with gzip
+    :type compress: bool
+    :return: The result, with the size and sha256 of the file and the
+        number of elements in the reply
+    :rtype: dict
+    """
+    fdesc, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(dest), prefix=".netconf_get"
+    )
+    try:
+        with os.fdopen(fdesc, "wb") as fhand:
+            digest = _Digest(fhand)
+            if compress:
+                with gzip.GzipFile(
+                    filename="", mode="wb", fileobj=digest, mtime=0
+                ) as zhand:
+                    ElementTree(response).write(
+                        zhand, encoding="utf-8", xml_declaration=True
+                    )
+            else:
+                ElementTree(response).write(
+                    digest, encoding="utf-8", xml_declaration=True
+                )
+        sha256 = digest.sha256.hexdigest()
+        changed = not os.path.isfile(dest) or _file_sha256(dest) != sha256
+        if changed and not module.check_mode:
+            module.atomic_move(tmp_path, dest)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return {
+        "changed": changed,
+        "dest": dest,
+        "size": digest.size,
+        "sha256": sha256,
+        "elements": sum(
+            1 for elem in response.iter() if isinstance(elem.tag, str)
+        ),
+    }
+
+
+def replies_sha256(replies):
+    """The sha256 of replies as they serialize, without building strings
+
+    :param replies: The reply elements
+    :type replies: list
+    :return: The hex digest
+    :rtype: str
+    """
+    digest = _Digest()
+    for response in replies:
+        ElementTree(response).write(digest, encoding="utf-8")
+        digest.write(b"\0")
+    return digest.sha256.hexdigest()
+
+
+def snapshot_path(directory, key):
+    """The snapshot file for a task in a host snapshot directory
+
+    :param directory: The snapshot directory of the host
+    :type directory: str
+    :param key: Anything identifying the request, e.g. source and filter
+    :return: The path of the snapshot file
+    :rtype: str
+    """
+    name = hashlib.sha256(
+        json.dumps(key, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+    return os.path.join(directory, name + ".json")
+
+
+def load_snapshot(path):
+    """Read a snapshot, None if there is none or it cannot be read
+
+    :param path: The path from snapshot_path
+    :type path: str
+    :return: A dict with the reply sha256 and the task result, or None
+    """
+    try:
+        with open(path) as fhand:
+            snapshot = json.load(fhand)
+        if "sha256" in snapshot and "result" in snapshot:
+            return snapshot
+    except (OSError, IOError, ValueError, TypeError):
+        pass
+    return None
+
+
+def save_snapshot(path, sha256, result):
+    """Replace a snapshot with the reply sha256 and task result
+
+    :param path: The path from snapshot_path
+    :type path: str
+    :param sha256: The digest from replies_sha256
+    :type sha256: str
+    :param result: The task result
+    :type result: dict
+    """
+    directory = os.path.dirname(path)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    fdesc, tmp_path = tempfile.mkstemp(dir=directory, prefix=".snapshot")
+    try:
+        with os.fdopen(fdesc, "w") as fhand:
+            json.dump({"sha256": sha256, "result": result}, fhand)
+        os.rename(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class Timings(object):
+    """The seconds spent in each phase of a task, with the number of
+    bytes and elements in the replies, for the timings option
+
+    When disabled, phases are not timed and nothing is counted, so the
+    calls can stay in place without a cost.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._phases = {}
+        self._counts = {"bytes": 0, "elements": 0}
+
+    @contextmanager
+    def phase(self, name):
+        """Add the time spent in the with block to a phase
+
+        :param name: The phase, e.g. rpc, lock, unlock, serialize, convert,
+            diff or commit
+        :type name: str
+        """
+        if not self.enabled:
+            yield
+            return
+        start = _clock()
+        try:
+            yield
+        finally:
+            self._phases[name] = self._phases.get(name, 0.0) + (
+                _clock() - start
+            )
+
+    def count_reply(self, response):
+        """Count the bytes and elements of a reply, outside of any phase
+
+        :param response: The reply, an element or an XML string
+        """
+        if not self.enabled or response is None:
+            return
+        if isinstance(response, (bytes, type(""))):
+            response = to_bytes(response, errors="surrogate_then_replace")
+            self._counts["bytes"] += len(response)
+            try:
+                response = fromstring(response)
+            except Exception:
+                return
+        else:
+            digest = _Digest()
+            ElementTree(response).write(digest, encoding="utf-8")
+            self._counts["bytes"] += digest.size
+        self._counts["elements"] += sum(
+            1 for elem in response.iter() if isinstance(elem.tag, str)
+        )
+
+    def result(self):
+        """The timings returned by the task
+
+        :return: The seconds for each phase and the counts
+        :rtype: dict
+        """
+        result = dict(
+            (name, round(seconds, 6)) for name, seconds in self._phases.items()
+        )
+        result.update(self._counts)
+        return result
@@ -2,16 +2,37 @@ from __future__ import absolute_import, division, print_function
 
 __metaclass__ = type
 
+import hashlib
+import os
 import re
 import sys
+from xml.sax.saxutils import escape, quoteattr
 from ansible.module_utils.basic import missing_required_lib
 from ansible.errors import AnsibleModuleError
 from ansible.module_utils._text import to_native
+from ansible_collections.cidrblock.dev.plugins.module_utils.dot_utils import (
+    iter_dotted,
+)
 
 try:
-    from lxml.etree import tostring, fromstring, XMLSyntaxError
+    from lxml.etree import (
+        cleanup_namespaces,
+        Entity,
+        tostring,
+        fromstring,
+        parse,
+        XMLParser,
+        XMLPullParser,
+        XMLSyntaxError,
+    )
+
+    HAS_LXML = True
+    XML_PARSER = "lxml"
 except ImportError:
-    from xml.etree.ElementTree import tostring, fromstring
+    from xml.etree.ElementTree import tostring, fromstring, parse
+
+    HAS_LXML = False
+    XML_PARSER = "xmltodict"
 
     if sys.version_info < (2, 7):
         from xml.parsers.expat import ExpatError as XMLSyntaxError
@@ -26,51 +47,990 @@ try:
 except ImportError:
     HAS_XMLTODICT = False
 
+# characters handed to the pull parser at a time when streaming
+CHUNK_SIZE = 1024 * 1024
+
+_MARKUP = re.compile(r"\s*<")
+
+# bound to the xml prefix by definition, never declared
+XML_NS = "http://www.w3.org/XML/1998/namespace"
+
+
+def is_xml_path(data):
+    """ Check if a string is the path of a file rather than a document
+
+    :param data: A string that may be an XML document or a path
+    :return: True if the string is not markup and names an existing file
+    :rtype: bool
+    """
+    return (
+        isinstance(data, str)
+        and not _MARKUP.match(data)
+        and os.path.isfile(data)
+    )
+
+
+def iter_chunks(data):
+    """ Yield a document or the content of a file CHUNK_SIZE at a time
+
+    :param data: The XML document or the path of a file holding it
+    :type data: str or bytes
+    :return: A generator of str or bytes chunks
+    """
+    if is_xml_path(data):
+        with open(data, "rb") as fhand:
+            chunk = fhand.read(CHUNK_SIZE)
+            while chunk:
+                yield chunk
+                chunk = fhand.read(CHUNK_SIZE)
+        return
+    for offset in range(0, len(data), CHUNK_SIZE):
+        yield data[offset : offset + CHUNK_SIZE]
+
 
 def ensure_xml_or_str(data, field):
+    """ Classify a string or dict option as XML or a plain string
+
+    The document is parsed once and the root element returned, so callers
+    can check the root tag without parsing it again. A string is only
+    tried as XML when it starts with '<', dict content is serialized and
+    then parsed. The element is None when the value is not a single
+    well formed document.
+
+    :param data: The option value
+    :type data: str, dict or None
+    :param field: The option name for error messages
+    :type field: str
+    :return: A tuple of (value, type, root element), the type is 'xml',
+        'str' or None
+    """
     if not data:
         tipe = None
     else:
         tipe = "str"
     result = data
-    if isinstance(data, str) and (re.match(r"^<.+>$", data)):
+    element = None
+    if isinstance(data, dict):
         try:
-            fromstring(filter)
-            tipe = "xml"
-        except XMLSyntaxError:
-            pass
+            result = "".join(iter_xml(data))
         except Exception as exc:
-            error = "'{field}' recognized as XML but was not valid. ".format(
+            error = "'{field}' was dictionary but conversion to XML failed. ".format(
                 field=field
             )
             raise AnsibleModuleError(error + to_native(exc))
-    if isinstance(data, dict):
-        if not HAS_XMLTODICT:
-            msg = "{field} was provided as a dictionary, conversion to XML requires 'xmltodict'. ".format(
-                field=field
-            )
-            raise AnsibleModuleError(msg + missing_required_lib("xmltodict"))
+        tipe = "xml"
+    if isinstance(result, str) and result.lstrip().startswith("<"):
         try:
-            result = xmltodict.unparse(data, full_document=False)
+            if HAS_LXML:
+                element = _to_element(result)
+            else:
+                element = fromstring(result)
             tipe = "xml"
+        except XMLSyntaxError:
+            pass
         except Exception as exc:
-            error = "'{field}' was dictionary but conversion to XML failed. ".format(
+            error = "'{field}' recognized as XML but was not valid. ".format(
                 field=field
             )
             raise AnsibleModuleError(error + to_native(exc))
-    return result, tipe
+    return result, tipe, element
 
 
-def xml_to_native(obj, field, full_doc=False, pretty=False):
-    if not HAS_XMLTODICT:
+def xml_to_native(
+    obj, field, full_doc=False, pretty=False, strip_namespaces=False
+):
+    if not HAS_LXML and not HAS_XMLTODICT:
         msg = "{field} was set to 'native, conversion from XML requires 'xmltodict'. ".format(
             field=field
         )
         raise AnsibleModuleError(msg + missing_required_lib("xmltodict"))
     try:
-        return xmltodict.parse(obj, dict_constructor=dict)
+        return parse_xml(obj, strip_namespaces=strip_namespaces)
     except Exception as exc:
-        error = "'xmltodict' returned the following error when converting {field} from XML. ".format(
+        error = "'{parser}' returned the following error when converting {field} from XML. ".format(
+            parser=XML_PARSER, field=field
+        )
+        raise AnsibleModuleError(error + to_native(exc))
+
+
+def _qualify(name, prefix):
+    """ Turn a '{uri}local' name into the 'prefix:local' form used in the
+    document, as xmltodict reports it
+    """
+    if name[0] != "{":
+        return name
+    local = name[name.index("}") + 1 :]
+    return prefix + ":" + local if prefix else local
+
+
+def _strip_namespace(path, key, value):
+    """ An xmltodict postprocessor dropping namespace prefixes and
+    declarations as each key is added
+    """
+    if key == "@xmlns" or key.startswith("@xmlns:"):
+        return None
+    if key[0] == "@" and ":" in key:
+        return "@" + key.rpartition(":")[2], value
+    return key.rpartition(":")[2], value
+
+
+def _xmltodict_parse(data, strip_namespaces, **kwargs):
+    if strip_namespaces:
+        kwargs["postprocessor"] = _strip_namespace
+    if is_xml_path(data):
+        with open(data, "rb") as fhand:
+            return xmltodict.parse(fhand, dict_constructor=dict, **kwargs)
+    if not isinstance(data, (str, bytes)):
+        data = tostring(data)
+    return xmltodict.parse(data, dict_constructor=dict, **kwargs)
+
+
+class _Names(dict):
+    """ The raw names of elements keyed by (tag, prefix), so each distinct
+    tag is only qualified once per document. With strip set, names are
+    reduced to the local name and the walkers pass None as the namespace
+    map, which drops the @xmlns attributes without looking them up.
+    redeclared holds the declarations of the elements repeating one of
+    their parent, from _parse_declared.
+    """
+
+    def __init__(self, strip=False, redeclared=None):
+        super(_Names, self).__init__()
+        self.strip = strip
+        self.root_nsmap = None if strip else {}
+        self.redeclared = {} if strip else redeclared or {}
+
+    def __missing__(self, key):
+        tag, prefix = key
+        name = self[key] = _qualify(tag, None if self.strip else prefix)
+        return name
+
+
+def _attributes(elem, nsmap, parent_nsmap, redeclared):
+    """ The attributes of an lxml element as xmltodict reports them,
+    with the namespaces it declares as @xmlns attributes
+
+    :param elem: The element
+    :param nsmap: The namespace map of the element, None when stripped
+    :param parent_nsmap: The namespace map of the parent element
+    :param redeclared: The redeclared map of the _Names cache
+    :return: A list of (name, value) tuples
+    """
+    attrs = []
+    if redeclared and elem in redeclared:
+        for key, uri in redeclared[elem]:
+            attrs.append(("@xmlns:" + key if key else "@xmlns", uri))
+    elif nsmap != parent_nsmap:
+        for key, uri in nsmap.items():
+            if parent_nsmap.get(key) != uri:
+                attrs.append(("@xmlns:" + key if key else "@xmlns", uri))
+    for key, val in elem.attrib.items():
+        if key[0] == "{" and nsmap is None:
+            key = _qualify(key, None)
+        elif key[0] == "{":
+            uri = key[1 : key.index("}")]
+            if uri == XML_NS:
+                ns = ["xml"]
+            else:
+                ns = [k for k, v in nsmap.items() if v == uri and k]
+            key = _qualify(key, (ns or [None])[0])
+        attrs.append(("@" + key, val))
+    return attrs
+
+
+def _skip_node(node):
+    """ Check a child node that is not an element can be skipped, as
+    comments and processing instructions are, an unresolved entity
+    reference would drop data so it raises as xmltodict does
+    """
+    if node.tag is Entity:
+        raise ValueError("entities are disabled")
+
+
+def _open_element(elem, parent_nsmap, names):
+    """ Start converting an lxml element
+
+    :param elem: The element
+    :param parent_nsmap: The namespace map of the parent element
+    :param names: The _Names cache for the document
+    :return: A tuple of (value, None) for an element without attributes
+        or children, otherwise (None, frame), the frame being a list of
+        the dict so far, the text parts, the children iterator and the
+        namespace map of the element
+    """
+    nsmap = None if parent_nsmap is None else elem.nsmap
+    redeclared = names.redeclared
+    if (
+        nsmap != parent_nsmap
+        or elem.attrib
+        or (redeclared and elem in redeclared)
+    ):
+        item = dict(_attributes(elem, nsmap, parent_nsmap, redeclared))
+    elif not len(elem):
+        return elem.text.strip() or None if elem.text else None, None
+    else:
+        item = None
+    return None, [item, [elem.text or ""], iter(elem), nsmap]
+
+
+def _element_to_native(elem, parent_nsmap, names):
+    """ Convert an lxml element to the value xmltodict would give it
+
+    The tree is walked with an explicit stack, each frame holding the
+    element name the value goes under in the frame below it, so deeply
+    nested documents do not hit the recursion limit.
+
+    :param elem: The element
+    :param parent_nsmap: The namespace map of the parent element
+    :param names: The _Names cache for the document
+    :return: None, the text of the element or a dict
+    """
+    value, frame = _open_element(elem, parent_nsmap, names)
+    if frame is None:
+        return value
+    stack = [(None, frame)]
+    while True:
+        frame = stack[-1][1]
+        for child in frame[2]:
+            if child.tail:
+                frame[1].append(child.tail)
+            tag = child.tag
+            if tag.__class__ is not str:
+                _skip_node(child)
+                continue
+            name = names[tag, child.prefix]
+            value, nested = _open_element(child, frame[3], names)
+            if nested is not None:
+                stack.append((name, nested))
+                break
+            item = frame[0]
+            if item is None:
+                frame[0] = {name: value}
+            elif name not in item:
+                item[name] = value
+            elif item[name].__class__ is list:
+                item[name].append(value)
+            else:
+                item[name] = [item[name], value]
+        else:
+            name, frame = stack.pop()
+            item = frame[0]
+            text = "".join(frame[1]).strip() or None
+            if item is None:
+                value = text
+            else:
+                if text is not None:
+                    item["#text"] = text
+                value = item
+            if not stack:
+                return value
+            frame = stack[-1][1]
+            item = frame[0]
+            if item is None:
+                frame[0] = {name: value}
+            elif name not in item:
+                item[name] = value
+            elif item[name].__class__ is list:
+                item[name].append(value)
+            else:
+                item[name] = [item[name], value]
+
+
+def _to_element(data):
+    """ Parse a document with lxml
+
+    Entities are not resolved, as with xmltodict. A text document is
+    encoded to and read as utf-8 whatever its declaration says, which is
+    also how xmltodict reads text. A path is read by libxml2 from the
+    file, without the document passing through a Python string.
+
+    :param data: The XML document or the path of a file holding it
+    :type data: str or bytes
+    :return: The root element
+    """
+    if is_xml_path(data):
+        parser = XMLParser(resolve_entities=False)
+        return parse(data, parser=parser).getroot()
+    if isinstance(data, bytes):
+        return fromstring(data, parser=XMLParser(resolve_entities=False))
+    parser = XMLParser(resolve_entities=False, encoding="utf-8")
+    return fromstring(data.encode("utf-8"), parser=parser)
+
+
+def _parse_declared(data):
+    """ Parse a document with lxml, finding the elements that declare a
+    namespace their parent already declares
+
+    The namespace map of an element does not tell such a declaration from
+    an inherited one, but xmltodict reports it. The declarations are
+    collected while parsing, and only when one repeats is the document
+    parsed again to tell which elements make them. Otherwise the document
+    is read as with _to_element.
+
+    :param data: The XML document or the path of a file holding it
+    :type data: str or bytes
+    :return: A tuple of (root element, redeclared), redeclared mapping
+        the elements found to the (prefix, uri) pairs they declare
+    """
+    kwargs = {"resolve_entities": False}
+    if isinstance(data, str) and not is_xml_path(data):
+        data = data.encode("utf-8")
+        kwargs["encoding"] = "utf-8"
+    parser = XMLPullParser(events=("start-ns",), **kwargs)
+    for chunk in iter_chunks(data):
+        parser.feed(chunk)
+    declarations = [value for _event, value in parser.read_events()]
+    root = parser.close()
+    if len(declarations) == len(set(declarations)):
+        return root, {}
+
+    parser = XMLPullParser(events=("start-ns", "start"), **kwargs)
+    redeclared = {}
+    pending = []
+    for chunk in iter_chunks(data):
+        parser.feed(chunk)
+        for event, value in parser.read_events():
+            if event == "start-ns":
+                pending.append(value)
+                continue
+            if pending:
+                parent = value.getparent()
+                if parent is not None and any(
+                    parent.nsmap.get(key or None) == uri
+                    for key, uri in pending
+                ):
+                    redeclared[value] = pending
+                pending = []
+    return parser.close(), redeclared
+
+
+def parse_xml(data, strip_namespaces=False):
+    """ Convert an XML document to native data
+
+    The result has the xmltodict shape, attributes as '@name', mixed text
+    as '#text' and repeated elements as a list. lxml is used when it is
+    installed, otherwise xmltodict.
+
+    An element given directly has no record of the namespaces declared
+    again by its descendants, these are only reported for a document.
+
+    :param data: The XML document, the path of a file or an lxml element
+    :type data: str, bytes or Element
+    :param strip_namespaces: Drop namespace prefixes and declarations
+    :type strip_namespaces: bool
+    :return: A dict with the root element name as the only key
+    :rtype: dict
+    """
+    if not HAS_LXML:
+        return _xmltodict_parse(data, strip_namespaces)
+    redeclared = None
+    if isinstance(data, (str, bytes)):
+        if strip_namespaces:
+            data = _to_element(data)
+        else:
+            data, redeclared = _parse_declared(data)
+    names = _Names(strip_namespaces, redeclared)
+    return {
+        names[data.tag, data.prefix]: _element_to_native(
+            data, names.root_nsmap, names
+        )
+    }
+
+
+def _element_entries(elem, path, parent_nsmap, names):
+    """ The flattened entries directly below an lxml element
+
+    :param elem: The element
+    :param path: The dotted path of the element
+    :param parent_nsmap: The namespace map of the parent element
+    :param names: The _Names cache for the document
+    :return: A tuple of (entries, nsmap), where each entry is a tuple of
+        (path, element) for a child element or (path, value) for a leaf,
+        or a tuple of (None, value) when the element is itself a leaf
+    """
+    nsmap = None if parent_nsmap is None else elem.nsmap
+    redeclared = names.redeclared
+    if (
+        nsmap == parent_nsmap
+        and not len(elem)
+        and not elem.attrib
+        and not (redeclared and elem in redeclared)
+    ):
+        return None, elem.text.strip() or None if elem.text else None
+    prefix = path + "."
+    entries = [
+        (prefix + key, val)
+        for key, val in _attributes(elem, nsmap, parent_nsmap, redeclared)
+    ]
+
+    groups = {}
+    text = [elem.text or ""]
+    for child in elem:
+        if child.tail:
+            text.append(child.tail)
+        tag = child.tag
+        if tag.__class__ is str:
+            groups.setdefault(names[tag, child.prefix], []).append(child)
+        else:
+            _skip_node(child)
+    text = "".join(text).strip() or None
+
+    if not entries and not groups:
+        return None, text
+    for name, group in groups.items():
+        if len(group) == 1:
+            entries.append((prefix + name, group[0]))
+        else:
+            name = prefix + name + "["
+            entries.extend(
+                (name + str(idx) + "]", child)
+                for idx, child in enumerate(group)
+            )
+    if text is not None:
+        entries.append((prefix + "#text", text))
+    return entries, nsmap
+
+
+def iter_xml_dotted(data, strip_namespaces=False):
+    """ Flatten an XML document straight into (dotted path, value) pairs
+
+    The pairs match to_dotted(xmltodict.parse(data)) without building the
+    intermediate dictionary. The document is parsed by lxml, or an lxml
+    element can be given directly, and the element tree is walked with an
+    explicit stack. Without lxml this falls back to xmltodict.
+
+    :param data: The XML document, the path of a file or an lxml element
+    :type data: str, bytes or Element
+    :param strip_namespaces: Drop namespace prefixes and declarations
+    :type strip_namespaces: bool
+    :return: A generator of (dotted path, leaf value) tuples
+    """
+    if not HAS_LXML:
+        for pair in iter_dotted(_xmltodict_parse(data, strip_namespaces)):
+            yield pair
+        return
+    redeclared = None
+    if isinstance(data, (str, bytes)):
+        if strip_namespaces:
+            data = _to_element(data)
+        else:
+            data, redeclared = _parse_declared(data)
+
+    names = _Names(strip_namespaces, redeclared)
+    root = names[data.tag, data.prefix]
+    stack = [(iter([(root, data)]), names.root_nsmap)]
+    while stack:
+        entries, nsmap = stack[-1]
+        for path, elem in entries:
+            if elem is None or elem.__class__ is str:
+                yield path, elem
+                continue
+            nested, value = _element_entries(elem, path, nsmap, names)
+            if nested is None:
+                yield path, value
+                continue
+            stack.append((iter(nested), value))
+            break
+        else:
+            stack.pop()
+
+
+def _subtree_to_native(elem, names):
+    """ Convert an element below the root as {name: value}
+
+    Only the namespaces declared on the element itself are reported, as
+    when the whole document is converted.
+
+    :param elem: The lxml element
+    :param names: The _Names cache for the document
+    :return: A dict with the element name as the only key
+    """
+    parent = elem.getparent()
+    if names.strip:
+        nsmap = None
+    elif parent is None:
+        nsmap = {}
+    else:
+        nsmap = parent.nsmap
+    name = names[elem.tag, elem.prefix]
+    return {name: _element_to_native(elem, nsmap, names)}
+
+
+def iter_xml_items(data, item_depth, strip_namespaces=False):
+    """ Stream the elements found at a depth of an XML document
+
+    The document is fed to the parser in chunks and each element at the
+    requested depth is converted as soon as it is complete, then removed
+    from the tree, so only one item is held in memory at a time. The
+    root element is at depth 1. Without lxml this falls back to the
+    xmltodict streaming mode, which collects the items into a list.
+
+    :param data: The XML document or the path of a file holding it
+    :type data: str or bytes
+    :param item_depth: The depth of the elements to yield
+    :type item_depth: int
+    :param strip_namespaces: Drop namespace prefixes and declarations
+    :type strip_namespaces: bool
+    :return: A generator of {name: value} dicts, each as xmltodict would
+        convert that element on its own
+    """
+    if not HAS_LXML:
+        items = []
+
+        def collect(path, item):
+            name = path[-1][0]
+            if strip_namespaces:
+                name = name.rpartition(":")[2]
+            items.append({name: item})
+            return True
+
+        _xmltodict_parse(
+            data,
+            strip_namespaces,
+            item_depth=item_depth,
+            item_callback=collect,
+        )
+        for item in items:
+            yield item
+        return
+
+    parser = XMLPullParser(
+        events=("start-ns", "start", "end"), resolve_entities=False
+    )
+    names = _Names(strip_namespaces)
+    redeclared = names.redeclared
+    pending = []
+    depth = 0
+    for chunk in iter_chunks(data):
+        parser.feed(chunk)
+        for event, elem in parser.read_events():
+            if event == "start-ns":
+                pending.append(elem)
+                continue
+            if event == "start":
+                depth += 1
+                if pending:
+                    parent = elem.getparent()
+                    if (
+                        not strip_namespaces
+                        and parent is not None
+                        and any(
+                            parent.nsmap.get(key or None) == uri
+                            for key, uri in pending
+                        )
+                    ):
+                        redeclared[elem] = pending
+                    pending = []
+                continue
+            if depth == item_depth:
+                parent = elem.getparent()
+                yield _subtree_to_native(elem, names)
+                if redeclared:
+                    for node in elem.iter():
+                        redeclared.pop(node, None)
+                elem.clear()
+                if parent is not None:
+                    while elem.getprevious() is not None:
+                        del parent[0]
+            depth -= 1
+    parser.close()
+
+
+def select_xml(data, path, namespaces=None, strip_namespaces=False):
+    """ Convert only the nodes of an XML document matching a path
+
+    With lxml the path is a full XPath expression evaluated by libxml2.
+    Matched elements are converted to native data, matched attributes
+    and text are returned as strings, and an expression with a scalar
+    result, e.g. count(), returns that value on its own. Without lxml the
+    path is an ElementPath expression for ElementTree findall, which
+    renames namespace prefixes to ns0, ns1 and so on in the result.
+
+    NETCONF replies use a default namespace, so element names need a
+    prefix from namespaces or a local-name() test to match.
+
+    :param data: The XML document, the path of a file or an lxml element
+    :type data: str, bytes or Element
+    :param path: The XPath or ElementPath expression
+    :type path: str
+    :param namespaces: A map of prefix to namespace URI for the path
+    :type namespaces: dict
+    :param strip_namespaces: Drop namespace prefixes and declarations
+    :type strip_namespaces: bool
+    :return: A list of {name: value} dicts and strings, or a scalar
+    """
+    if not HAS_LXML:
+        if is_xml_path(data):
+            data = parse(data).getroot()
+        elif isinstance(data, (str, bytes)):
+            data = fromstring(data)
+        matches = []
+        for elem in data.findall(path, namespaces):
+            elem.tail = None
+            matches.append(_xmltodict_parse(elem, strip_namespaces))
+        return matches
+
+    if isinstance(data, (str, bytes)):
+        data = _to_element(data)
+    result = data.xpath(path, namespaces=namespaces, smart_strings=False)
+    if not isinstance(result, list):
+        return result
+    names = _Names(strip_namespaces)
+    matches = []
+    for match in result:
+        if not hasattr(match, "tag"):
+            matches.append(match)
+        elif isinstance(match.tag, str):
+            matches.append(_subtree_to_native(match, names))
+        else:
+            matches.append(match.text)
+    return matches
+
+
+def strip_tree_namespaces(root):
+    """ Drop the namespaces of an element tree in place, in a single walk
+
+    The tree serializes as the remove_namespaces XSLT would give it after
+    a parse without blank text. Tags and attributes are reduced to their
+    local names, the declarations are dropped and whitespace-only text
+    between elements is removed.
+
+    :param root: The root element, changed in place
+    :return: The root element
+    """
+    local = {}
+    for elem in root.iter():
+        tag = elem.tag
+        if isinstance(tag, str):
+            name = local.get(tag)
+            if name is None:
+                name = local[tag] = tag.rpartition("}")[2]
+            elem.tag = name
+            attrib = elem.attrib
+            if attrib and any(key[0] == "{" for key in attrib):
+                items = list(attrib.items())
+                attrib.clear()
+                for key, value in items:
+                    attrib[key.rpartition("}")[2]] = value
+            if len(elem) and elem.text is not None and not elem.text.strip():
+                elem.text = None
+        if elem.tail is not None and not elem.tail.strip():
+            elem.tail = None
+    if HAS_LXML:
+        cleanup_namespaces(root)
+    return root
+
+
+def xml_to_dotted(obj, field, strip_namespaces=False):
+    if not HAS_LXML and not HAS_XMLTODICT:
+        msg = "{field} was set to 'dotted', conversion from XML requires 'lxml' or 'xmltodict'. ".format(
+            field=field
+        )
+        raise AnsibleModuleError(
+            msg + missing_required_lib("lxml or xmltodict")
+        )
+    try:
+        return dict(iter_xml_dotted(obj, strip_namespaces=strip_namespaces))
+    except Exception as exc:
+        error = "Parsing XML returned the following error when converting {field} to dotted paths. ".format(
             field=field
         )
         raise AnsibleModuleError(error + to_native(exc))
+
+
+def as_element(data):
+    """ The root element of an XML document in any of its forms
+
+    A path is read from the file, with lxml also when it is gzip
+    compressed, and a dict in the xmltodict shape is serialized first.
+
+    :param data: The XML document, the path of a file, a dict or an element
+    :type data: str, bytes, dict or Element
+    :return: The root element
+    """
+    if hasattr(data, "tag"):
+        return data
+    if isinstance(data, dict):
+        data = "".join(iter_xml(data))
+    if HAS_LXML:
+        return _to_element(data)
+    if is_xml_path(data):
+        return parse(data).getroot()
+    return fromstring(data)
+
+
+def _significant(text):
+    if text is None or not text.strip():
+        return ""
+    return text
+
+
+def _node(elem, attributes, tail=True):
+    """ What is compared for an element besides its children, the tail
+    being left out for the root element
+    """
+    return (
+        elem.tag,
+        _significant(elem.text),
+        _significant(elem.tail) if tail else "",
+        sorted(elem.attrib.items()) if attributes else None,
+    )
+
+
+def _tree_digest(root, attributes):
+    """ The digest of a subtree, blind to the order of siblings """
+    digests = {}
+    # reversed document order reaches the children before their parent
+    for elem in reversed(list(root.iter())):
+        if not isinstance(elem.tag, str):
+            continue
+        node = _node(elem, attributes, elem is not root)
+        sha256 = hashlib.sha256(repr(node).encode("utf-8"))
+        children = [child for child in elem if isinstance(child.tag, str)]
+        for digest in sorted(digests.pop(child) for child in children):
+            sha256.update(digest)
+        digests[elem] = sha256.digest()
+    return digests[root]
+
+
+def xml_equal(left, right, unordered=False, attributes=False):
+    """ Compare two XML documents by structure
+
+    Elements are compared by namespace and local name, so the prefixes
+    and the placement of namespace declarations do not matter, and text
+    made only of whitespace, e.g. indentation, is ignored. Attributes are
+    ignored unless attributes is set, as sanitize_xml drops them.
+
+    In order, the trees are walked side by side in document order and
+    the first difference ends the walk. With unordered, siblings can be
+    in any order, which suits keyed lists, and each subtree is compared
+    by a digest built from the digests of its children, sorted.
+
+    :param left: The XML document, the path of a file or an element
+    :type left: str, bytes or Element
+    :param right: The XML document, the path of a file or an element
+    :type right: str, bytes or Element
+    :param unordered: Ignore the order of sibling elements
+    :type unordered: bool
+    :param attributes: Compare attributes
+    :type attributes: bool
+    :return: True when the documents are equal
+    :rtype: bool
+    """
+    left = as_element(left)
+    right = as_element(right)
+    if left.tag != right.tag:
+        return False
+    if unordered:
+        return _tree_digest(left, attributes) == _tree_digest(
+            right, attributes
+        )
+    # document order with the number of children of each node gives the
+    # structure, so the trees can be walked side by side by the library
+    for left_node, right_node in zip(left.iter(), right.iter()):
+        if left_node.tag != right_node.tag or len(left_node) != len(
+            right_node
+        ):
+            return False
+        if left_node.text != right_node.text and (
+            _significant(left_node.text) != _significant(right_node.text)
+        ):
+            return False
+        if (
+            left_node.tail != right_node.tail
+            and left_node is not left
+            and _significant(left_node.tail) != _significant(right_node.tail)
+        ):
+            return False
+        if attributes and dict(left_node.attrib) != dict(right_node.attrib):
+            return False
+    return True
+
+
+def _to_text(value):
+    """ The text of a scalar, the same as xmltodict.unparse """
+    if value.__class__ is str:
+        return value
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, bytes):
+        return value.decode("utf-8", "replace")
+    return str(value)
+
+
+def _is_sequence(value):
+    return hasattr(value, "__iter__") and not isinstance(
+        value, (str, bytes, dict)
+    )
+
+
+def _occurrences(items):
+    """ Expand (name, value) pairs so each list entry is an element """
+    for key, value in items:
+        if _is_sequence(value):
+            for entry in value:
+                yield key, entry
+        else:
+            yield key, value
+
+
+def _check_name(name, kind, checked):
+    """ Reject element and attribute names that would break out of the
+    tag, as xmltodict.unparse does
+
+    :param name: The element or attribute name
+    :param kind: 'element' or 'attribute', for the error message
+    :param checked: The names already found valid, updated in place
+    :type checked: set
+    """
+    if name in checked:
+        return
+    if not isinstance(name, str):
+        raise ValueError("{} name must be a string".format(kind))
+    if name.startswith(("?", "!")):
+        raise ValueError(
+            'Invalid {} name: cannot start with "?" or "!"'.format(kind)
+        )
+    if "<" in name or ">" in name:
+        raise ValueError(
+            'Invalid {} name: "<" or ">" not allowed'.format(kind)
+        )
+    if "/" in name:
+        raise ValueError('Invalid {} name: "/" not allowed'.format(kind))
+    if '"' in name or "'" in name:
+        raise ValueError("Invalid {} name: quotes not allowed".format(kind))
+    if "=" in name:
+        raise ValueError('Invalid {} name: "=" not allowed'.format(kind))
+    if any(char.isspace() for char in name):
+        raise ValueError(
+            "Invalid {} name: whitespace not allowed".format(kind)
+        )
+    checked.add(name)
+
+
+def _start_tag(key, value, checked):
+    """ Split an element value into its start tag, text and children
+
+    :param key: The element name
+    :param value: The element value in the xmltodict shape
+    :param checked: The names already found valid, updated in place
+    :type checked: set
+    :return: A tuple of (start tag, escaped text or None, children)
+    """
+    _check_name(key, "element", checked)
+    if value is None:
+        return "<{}>".format(key), None, ()
+    if not isinstance(value, dict):
+        return "<{}>".format(key), escape(_to_text(value)), ()
+    tag = ["<", key]
+    text = None
+    children = []
+    for name, val in value.items():
+        if name == "#text":
+            if val is not None:
+                text = escape(_to_text(val))
+        elif name == "@xmlns" and isinstance(val, dict):
+            for prefix, uri in val.items():
+                _check_name(prefix, "attribute", checked)
+                tag.append(
+                    " xmlns:{}=".format(prefix) if prefix else " xmlns="
+                )
+                tag.append(quoteattr("" if uri is None else _to_text(uri)))
+        elif name[0] == "@":
+            _check_name(name[1:], "attribute", checked)
+            tag.append(" {}=".format(name[1:]))
+            tag.append(quoteattr("" if val is None else _to_text(val)))
+        else:
+            children.append((name, val))
+    tag.append(">")
+    return "".join(tag), text, children
+
+
+def iter_xml(data, full_doc=False, pretty=False):
+    """ Serialize native data to XML a fragment at a time
+
+    The input has the xmltodict shape and the output matches
+    xmltodict.unparse, but the document is produced from an explicit stack
+    as it is consumed, so a large payload never exists as a single string
+    unless the caller joins it. Element and attribute names that would
+    break out of the tag raise ValueError, as they do there.
+
+    :param data: The native data, a dict with the root element(s) as keys
+    :type data: dict
+    :param full_doc: Add an XML declaration and require a single root
+    :type full_doc: bool
+    :param pretty: Indent the elements with tabs, one per line
+    :type pretty: bool
+    :return: A generator of str fragments
+    """
+    indent, newl = ("\t", "\n") if pretty else ("", "")
+    if full_doc:
+        if sum(1 for key in data if key != "#comment") != 1:
+            raise ValueError("Document must have exactly one root.")
+        yield '<?xml version="1.0" encoding="utf-8"?>\n'
+    roots = 0
+    checked = set()
+    stack = [(_occurrences(data.items()), 0, None)]
+    while stack:
+        items, depth, end = stack[-1]
+        for key, value in items:
+            if key == "#comment":
+                if value is not None:
+                    yield "{}<!--{}-->{}".format(
+                        indent * depth, _to_text(value), newl
+                    )
+                continue
+            if full_doc and not depth:
+                roots += 1
+                if roots > 1:
+                    raise ValueError("document with multiple roots")
+            start, text, children = _start_tag(key, value, checked)
+            close = "</{}>{}".format(key, newl if depth else "")
+            children = [
+                child
+                for child in children
+                if not (isinstance(child[1], list) and not child[1])
+            ]
+            if children:
+                yield indent * depth + start + newl
+                close = (text or "") + indent * depth + close
+                stack.append((_occurrences(children), depth + 1, close))
+                break
+            yield indent * depth + start + (text or "") + close
+        else:
+            stack.pop()
+            if end is not None:
+                yield end
+
+
+def write_xml(data, dest, full_doc=False, pretty=False):
+    """ Serialize native data to XML and write it to a file like object
+
+    Fragments from iter_xml are gathered into writes of about CHUNK_SIZE
+    characters.
+
+    :param data: The native data, a dict with the root element(s) as keys
+    :type data: dict
+    :param dest: An object with a write method accepting str
+    :param full_doc: Add an XML declaration and require a single root
+    :type full_doc: bool
+    :param pretty: Indent the elements with tabs, one per line
+    :type pretty: bool
+    :return: The number of characters written
+    :rtype: int
+    """
+    written = 0
+    chunk = []
+    size = 0
+    for fragment in iter_xml(data, full_doc=full_doc, pretty=pretty):
+        chunk.append(fragment)
+        size += len(fragment)
+        if size >= CHUNK_SIZE:
+            dest.write("".join(chunk))
+            written += size
+            chunk = []
+            size = 0
+    if chunk:
+        dest.write("".join(chunk))
+        written += size
+    return written
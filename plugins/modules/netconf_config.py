@@ -33,6 +33,80 @@ options:
     type: str
     aliases:
     - xml
+  contents:
+    description:
+    - A list of configuration data, each entry as in I(content), applied with
+      successive edit-config operations within a single lock of the I(target)
+      datastore and a single, optionally confirmed, commit.
+    - The result of each entry is returned in C(contents). When an entry fails, the
+      entries after it are skipped, the changes to the candidate datastore are
+      discarded and the task fails.
+    - The running datastore has nothing to discard, so with I(target=running), or
+      with I(target=auto) on a server without the candidate datastore, the entries
+      before the one that failed stay applied and the task fails with C(changed)
+      set.
+    type: list
+    elements: raw
+  desired_state:
+    description:
+    - The desired configuration, with I(config) as root tag, as an xml string or a
+      dictionary, e.g. the I(native) output of C(netconf_get) updated in place.
+    - The current configuration of the top-level containers in it, or the part
+      selected by I(get_filter), is read from the I(target) datastore and only the
+      changes are sent with edit-config. Changed leaves and new subtrees are sent
+      within their parents.
+    - Leaves and containers missing from I(desired_state) are kept unless
+      I(prune_nodes) is set, and list entries unless I(prune_lists) is set, so
+      I(desired_state) can be read with a filter that selects part of the
+      configuration. List entries are matched by their keys, see I(list_keys).
+    - In check mode the changes are returned as C(edit) without editing the device.
+    type: raw
+  list_keys:
+    description:
+    - The names of the key leaves of lists, by list name, for I(desired_state).
+    - By default, the key of a list entry is its first leaf, which is where RFC 7950
+      puts the keys. Set the keys of lists with more than one key here.
+    - An element found once in both the current and the desired configuration is
+      matched as a container unless it is named here, so name every list that can
+      have a single entry, with its key leaves.
+    type: dict
+  prune_lists:
+    description:
+    - Delete the list entries of the current configuration that are missing from
+      I(desired_state).
+    type: bool
+    default: false
+  prune_nodes:
+    description:
+    - Delete the leaves and containers of the current configuration that are
+      missing from I(desired_state), with C(operation="delete").
+    - Only set this when I(desired_state) holds the whole of its top-level
+      containers, or of the part selected by I(get_filter). Everything else the
+      read returns is deleted.
+    type: bool
+    default: false
+  simulate:
+    description:
+    - In check mode, predict the result of I(content) or I(contents) without
+      locking or editing the device. The top-level containers in the content, or
+      the part selected by I(get_filter), are read once from the running datastore,
+      or taken from I(running_config), and the content is applied to them locally
+      with the merge, replace, create, delete and remove operations of edit-config.
+    - C(changed) and the diff are those of the simulated edit, an edit the device
+      would reject, e.g. deleting a missing element, fails the task.
+    - List entries are matched as with I(desired_state), see I(list_keys).
+    type: bool
+    default: false
+  running_config:
+    description:
+    - The running configuration used by I(simulate) instead of reading it from the
+      device, as an xml string, a dictionary or the path of a file on the
+      controller, e.g. one written by C(netconf_get) with I(dest), gzip compressed
+      or not.
+    - A relative path is resolved against the playbook or role directory, as
+      I(dest) of C(netconf_get) is, and a value that is neither XML nor the path
+      of an existing file fails the task.
+    type: raw
   target:
     description: Name of the configuration datastore to be edited. - auto, uses candidate
       and fallback to running - candidate, edit <candidate/> datastore and then commit
@@ -200,6 +274,43 @@ options:
       string or XPath, if the filter is in XPath format the NETCONF server running
       on remote host should support xpath capability else it will result in an error.
     type: str
+  reads:
+    description:
+    - How the configuration is read to tell whether the task changed it.
+    - With I(full), C(before) is read from the I(target) datastore and C(after)
+      from the candidate datastore, or from the running datastore when there is
+      no commit, both in full or as restricted by I(get_filter).
+    - In both cases the reply read for I(backup) serves as C(before).
+    - With I(minimal), C(after) is read from the candidate datastore whenever it
+      is the target. Unless the diff is requested or I(get_filter) is set, only the
+      top-level containers in I(content) are read, and the backup reply is
+      narrowed to them locally.
+    type: str
+    default: full
+    choices:
+    - full
+    - minimal
+  ignore_order:
+    description:
+    - C(before) and C(after) are compared by structure, ignoring namespace
+      prefixes, attributes and whitespace between elements, to tell whether the
+      task changed the configuration. Set to C(true) to also ignore the order of
+      sibling elements, for servers that return list entries in any order.
+    type: bool
+    default: false
+  timings:
+    description:
+    - Return the seconds spent in each phase of the task as C(timings), with the
+      number of bytes and elements in the configuration read from the device.
+    type: bool
+    default: false
+  refresh_capabilities:
+    description:
+    - The capabilities of the NETCONF server are cached for the lifetime of the
+      persistent connection, so tasks after the first one do not ask for them again.
+      Set to C(true) to ask the connection and update the cache.
+    type: bool
+    default: false
 requirements:
 - ncclient
 notes:
@@ -244,6 +355,29 @@ EXAMPLES = """
           </system>
       </config>
 
+- name: Send only what changed in the interface configuration
+  ansible.netcommon.netconf_config:
+    desired_state:
+      config:
+        System: "{{ updated['config']['output']['data']['System'] }}"
+  register: result
+
+- name: Apply a rollout in one transaction
+  ansible.netcommon.netconf_config:
+    contents:
+    - "{{ lookup('template', 'interfaces.xml.j2') }}"
+    - "{{ lookup('template', 'vlans.xml.j2') }}"
+    - "{{ lookup('template', 'bgp.xml.j2') }}"
+    confirm: 120
+
+- name: Predict the change from a saved snapshot of the running configuration
+  ansible.netcommon.netconf_config:
+    content: "{{ lookup('template', 'interfaces.xml.j2') }}"
+    simulate: true
+    running_config: "snapshots/{{ inventory_hostname }}.xml.gz"
+  check_mode: true
+  diff: true
+
 - name: configure interface while providing different private key file path (for connection=netconf)
   ansible.netcommon.netconf_config:
     backup: yes
@@ -270,6 +404,43 @@ backup_path:
   returned: when backup is yes
   type: str
   sample: /playbooks/ansible/backup/config.2016-07-16@22:28:34
+timings:
+  description:
+  - The seconds spent in each phase of the task, C(lock), C(rpc), C(unlock),
+    C(serialize), C(diff) and C(commit), only the phases the task went through
+    are returned.
+  - C(bytes) and C(elements) count the size and the elements of the configuration
+    read from the device.
+  returned: when I(timings) is set
+  type: dict
+  sample:
+    lock: 0.012201
+    rpc: 0.843302
+    diff: 0.061722
+    commit: 0.421955
+    unlock: 0.010012
+    bytes: 412800
+    elements: 10322
+contents:
+  description:
+  - The result of each entry of I(contents), in order, with its C(index) and
+    C(status), I(applied), I(failed) or I(skipped), and the error C(msg) of the
+    entry that failed.
+  returned: when I(contents) is set
+  type: list
+  sample:
+  - index: 0
+    status: applied
+  - index: 1
+    status: failed
+    msg: "bad-element: vlan"
+  - index: 2
+    status: skipped
+edit:
+  description: The configuration sent with edit-config, null when nothing changed
+  returned: when I(desired_state) is set
+  type: str
+  sample: <config xmlns:nc="urn:ietf:params:xml:ns:netconf:base:1.0"><System xmlns="http://cisco.com/ns/yang/cisco-nx-os-device"><intf-items><phys-items><PhysIf-list><id>eth1/10</id><descr>uplink</descr></PhysIf-list></phys-items></intf-items></System></config>
 diff:
   description: If --diff option in enabled while running, the before and after configuration change are
                returned as part of before and after key.
@@ -280,16 +451,27 @@ diff:
     "before": "<rpc-reply>\n<data>\n<configuration>\n <version>17.3R1.10</version>...<--snip-->"
 """
 
-from ansible.module_utils._text import to_text
+from ansible.errors import AnsibleModuleError
+from ansible.module_utils._text import to_bytes, to_text
 from ansible.module_utils.basic import AnsibleModule, env_fallback
 from ansible.module_utils.connection import Connection, ConnectionError
 from ansible_collections.ansible.netcommon.plugins.module_utils.network.netconf.netconf import (
-    get_capabilities,
     get_config,
     sanitize_xml,
 )
+from ansible_collections.cidrblock.dev.plugins.module_utils.netconf_utils import (
+    cached_capabilities,
+    config_edit,
+    content_scope,
+    scope_reply,
+    simulate_edit,
+    Timings,
+)
 from ansible_collections.cidrblock.dev.plugins.module_utils.xml_utils import (
+    as_element,
     ensure_xml_or_str,
+    is_xml_path,
+    xml_equal,
     xml_to_native,
 )
 
@@ -306,20 +488,102 @@ except ImportError:
         from xml.etree.ElementTree import ParseError as XMLSyntaxError
 
 
-def validate_config(module, config, format="xml"):
+def validate_config(module, root, format="xml"):
     if format == "xml":
-        root = fromstring(config)
-        if root.tag != "config":
+        if root is None or root.tag != "config":
             module.fail_json(
                 msg="content value should have xml string with <config> tag as root"
             )
 
 
+def simulate(module, conn, edits, filter_spec, result, timings):
+    """Predict the result of the edits in check mode without the device
+
+    The top-level containers of the edits, or the part selected by
+    get_filter, are read once from the running datastore, or taken from
+    running_config, and the edits are applied to them locally.
+    """
+    if any(edit_format != "xml" for _edit, edit_format, _root in edits):
+        module.fail_json(msg="simulate requires content in xml format")
+    for _edit, edit_format, edit_root in edits:
+        validate_config(module, edit_root, edit_format)
+    spec, roots = content_scope(
+        *[edit_root for _edit, _format, edit_root in edits]
+    )
+    if filter_spec is not None:
+        spec, roots = filter_spec, None
+
+    running_config = module.params["running_config"]
+    if (
+        isinstance(running_config, str)
+        and not running_config.lstrip().startswith("<")
+        and not is_xml_path(running_config)
+    ):
+        module.fail_json(
+            msg="running_config file not found: %s" % running_config
+        )
+    try:
+        if running_config is not None:
+            with timings.phase("convert"):
+                current = as_element(running_config)
+            if roots:
+                current = scope_reply(current, roots)
+        else:
+            with timings.phase("rpc"):
+                current = fromstring(
+                    to_bytes(
+                        conn.get_config(source="running", filter=spec),
+                        errors="surrogate_then_replace",
+                    )
+                )
+        timings.count_reply(current)
+        with timings.phase("diff"):
+            simulated = current
+            for _edit, _format, edit_root in edits:
+                simulated = simulate_edit(
+                    simulated,
+                    edit_root,
+                    module.params["default_operation"],
+                    module.params["list_keys"],
+                )
+            changed = not xml_equal(
+                current, simulated, unordered=module.params["ignore_order"]
+            )
+    except ConnectionError as exc:
+        module.fail_json(
+            msg=to_text(exc, errors="surrogate_then_replace").strip()
+        )
+    except AnsibleModuleError as exc:
+        module.fail_json(msg="edit-config would fail: %s" % to_text(exc))
+    except (IOError, OSError, XMLSyntaxError) as exc:
+        module.fail_json(
+            msg="running_config could not be read: %s" % to_text(exc)
+        )
+
+    result["changed"] = changed
+    if changed and module._diff:
+        with timings.phase("diff"):
+            result["diff"] = {
+                "before": sanitize_xml(to_text(tostring(current))),
+                "after": sanitize_xml(to_text(tostring(simulated))),
+            }
+    if timings.enabled:
+        result["timings"] = timings.result()
+    module.exit_json(**result)
+
+
 def main():
     """main entry point for module execution"""
     backup_spec = dict(filename=dict(), dir_path=dict(type="path"))
     argument_spec = dict(
         content=dict(aliases=["xml"], type="raw"),
+        contents=dict(type="list", elements="raw"),
+        desired_state=dict(type="raw"),
+        list_keys=dict(type="dict"),
+        prune_lists=dict(type="bool", default=False),
+        prune_nodes=dict(type="bool", default=False),
+        simulate=dict(type="bool", default=False),
+        running_config=dict(type="raw"),
         target=dict(
             choices=["auto", "candidate", "running"],
             default="auto",
@@ -348,6 +612,10 @@ def main():
         commit=dict(type="bool", default=True),
         validate=dict(type="bool", default=False),
         get_filter=dict(),
+        reads=dict(choices=["full", "minimal"], default="full"),
+        ignore_order=dict(type="bool", default=False),
+        timings=dict(type="bool", default=False),
+        refresh_capabilities=dict(type="bool", default=False),
     )
 
     # deprecated options
@@ -407,10 +675,26 @@ def main():
     argument_spec.update(netconf_top_spec)
 
     mutually_exclusive = [
-        ("content", "src", "source_datastore", "delete", "confirm_commit")
+        (
+            "content",
+            "contents",
+            "desired_state",
+            "src",
+            "source_datastore",
+            "delete",
+            "confirm_commit",
+        )
     ]
     required_one_of = [
-        ("content", "src", "source_datastore", "delete", "confirm_commit")
+        (
+            "content",
+            "contents",
+            "desired_state",
+            "src",
+            "source_datastore",
+            "delete",
+            "confirm_commit",
+        )
     ]
 
     module = AnsibleModule(
@@ -421,9 +705,26 @@ def main():
     )
 
     _config = module.params["content"] or module.params["src"]
-    config, format = ensure_xml_or_str(_config, "content")
+    config, format, root = ensure_xml_or_str(_config, "content")
     if format == "str":
         format = "text"
+    desired_root = None
+    if module.params["desired_state"] is not None:
+        _desired, _tipe, desired_root = ensure_xml_or_str(
+            module.params["desired_state"], "desired_state"
+        )
+        validate_config(module, desired_root)
+    fragments = []
+    for fragment in module.params["contents"] or []:
+        fragment, fragment_format, fragment_root = ensure_xml_or_str(
+            fragment, "contents"
+        )
+        if not fragment:
+            module.fail_json(msg="contents should not have empty entries")
+        if fragment_format == "str":
+            fragment_format = "text"
+        validate_config(module, fragment_root, fragment_format)
+        fragments.append((fragment, fragment_format, fragment_root))
     target = module.params["target"]
     lock = module.params["lock"]
     source = module.params["source_datastore"]
@@ -434,7 +735,9 @@ def main():
     save = module.params["save"]
     # format = module.params["format"] unused, rely on detection
 
-    filter, tipe = ensure_xml_or_str(module.params["get_filter"], "filter")
+    filter, tipe, _root = ensure_xml_or_str(
+        module.params["get_filter"], "filter"
+    )
     if tipe == "xml":
         filter_type = "subtree"
     elif tipe == "str":
@@ -443,7 +746,9 @@ def main():
         filter_type = tipe
 
     conn = Connection(module._socket_path)
-    capabilities = get_capabilities(module)
+    capabilities = cached_capabilities(
+        module, module.params["refresh_capabilities"]
+    )
     operations = capabilities["device_operations"]
 
     supports_commit = operations.get("supports_commit", False)
@@ -519,34 +824,99 @@ def main():
         "changed": False,
         "server_capabilities": capabilities.get("server_capabilities", []),
     }
+    # with minimal reads and no diff requested, before and after are only
+    # read for the top-level containers the content touches
+    minimal = module.params["reads"] == "minimal"
+    compare_spec = filter_spec
+    scope_roots = None
+    if desired_root is not None:
+        scope_configs = [desired_root]
+    elif fragments:
+        scope_configs = [
+            fragment_root
+            for _fragment, fragment_format, fragment_root in fragments
+        ]
+        if any(
+            fragment_format != "xml"
+            for _fragment, fragment_format, _root in fragments
+        ):
+            scope_configs = []
+    elif format == "xml" and root is not None:
+        scope_configs = [root]
+    else:
+        scope_configs = []
+    if (
+        (minimal or desired_root is not None)
+        and not module._diff
+        and filter_spec is None
+        and scope_configs
+    ):
+        scope_spec, scope_roots = content_scope(*scope_configs)
+        if scope_spec is not None:
+            compare_spec = scope_spec
+
     before = None
     after = None
     locked = False
+    timings = Timings(module.params["timings"])
+
+    if (
+        module.check_mode
+        and module.params["simulate"]
+        and (config or fragments)
+    ):
+        simulate(
+            module,
+            conn,
+            fragments or [(config, format, root)],
+            filter_spec,
+            result,
+            timings,
+        )
+
     try:
         if module.params["backup"]:
-            response = get_config(
-                module, target, filter_spec, lock=execute_lock
-            )
-            before = to_text(
-                tostring(response), errors="surrogate_then_replace"
-            ).strip()
+            with timings.phase("rpc"):
+                response = get_config(
+                    module, target, filter_spec, lock=execute_lock
+                )
+            timings.count_reply(response)
+            with timings.phase("serialize"):
+                before = to_text(
+                    tostring(response), errors="surrogate_then_replace"
+                ).strip()
             result["__backup__"] = before.strip()
+            if scope_roots:
+                # the backup serves as before, narrowed to the scope
+                with timings.phase("serialize"):
+                    before = to_text(
+                        tostring(scope_reply(response, scope_roots)),
+                        errors="surrogate_then_replace",
+                    ).strip()
         if validate:
-            conn.validate(target)
+            with timings.phase("rpc"):
+                conn.validate(target)
         if source:
             if not module.check_mode:
-                conn.copy(source, target)
+                with timings.phase("rpc"):
+                    conn.copy(source, target)
             result["changed"] = True
         elif delete:
             if not module.check_mode:
-                conn.delete(target)
+                with timings.phase("rpc"):
+                    conn.delete(target)
             result["changed"] = True
         elif confirm_commit:
             if not module.check_mode:
-                conn.commit()
+                with timings.phase("commit"):
+                    conn.commit()
             result["changed"] = True
-        elif config:
-            if module.check_mode and not supports_commit:
+        elif config or desired_root is not None or fragments:
+            if (
+                module.check_mode
+                and not supports_commit
+                and desired_root is None
+            ):
                 module.warn(
                     "check mode not supported as Netconf server doesn't support candidate capability"
                 )
@@ -554,58 +924,141 @@ def main():
                 module.exit_json(**result)
 
             if execute_lock:
-                conn.lock(target=target)
+                with timings.phase("lock"):
+                    conn.lock(target=target)
                 locked = True
             if before is None:
-                before = to_text(
-                    conn.get_config(source=target, filter=filter_spec),
-                    errors="surrogate_then_replace",
-                ).strip()
+                with timings.phase("rpc"):
+                    before = to_text(
+                        conn.get_config(source=target, filter=compare_spec),
+                        errors="surrogate_then_replace",
+                    ).strip()
+                timings.count_reply(before)
 
-            validate_config(module, config, format)
-            kwargs = {
-                "config": config,
-                "target": target,
-                "default_operation": module.params["default_operation"],
-                "error_option": module.params["error_option"],
-                "format": format,
-            }
-
-            conn.edit_config(**kwargs)
-
-            if supports_commit and module.params["commit"]:
-                after = to_text(
-                    conn.get_config(source="candidate", filter=filter_spec),
-                    errors="surrogate_then_replace",
-                ).strip()
-                if not module.check_mode:
-                    confirm_timeout = confirm if confirm > 0 else None
-                    confirmed_commit = True if confirm_timeout else False
-                    conn.commit(
-                        confirmed=confirmed_commit, timeout=confirm_timeout
+            if desired_root is not None:
+                with timings.phase("diff"):
+                    edit = config_edit(
+                        fromstring(
+                            to_bytes(before, errors="surrogate_then_replace")
+                        ),
+                        desired_root,
+                        module.params["list_keys"],
+                        module.params["prune_lists"],
+                        module.params["prune_nodes"],
                     )
+                if edit is None:
+                    config = None
                 else:
-                    conn.discard_changes()
+                    config = to_text(tostring(edit))
+                    root = edit
+                    format = "xml"
+                result["edit"] = config
+                if module.check_mode:
+                    # the edit tells the change, the device is left alone
+                    result["changed"] = config is not None
+                    config = None
 
-            if after is None:
-                after = to_text(
-                    conn.get_config(source="running", filter=filter_spec),
-                    errors="surrogate_then_replace",
-                ).strip()
+            edits = fragments
+            if config:
+                edits = [(config, format, root)]
+            if edits:
+                applied = []
+                for index, entry in enumerate(edits):
+                    fragment, fragment_format, fragment_root = entry
+                    validate_config(module, fragment_root, fragment_format)
+                    kwargs = {
+                        "config": fragment,
+                        "target": target,
+                        "default_operation": module.params[
+                            "default_operation"
+                        ],
+                        "error_option": module.params["error_option"],
+                        "format": fragment_format,
+                    }
+                    try:
+                        with timings.phase("rpc"):
+                            conn.edit_config(**kwargs)
+                    except ConnectionError as exc:
+                        if not fragments:
+                            raise
+                        applied.append(
+                            {
+                                "index": index,
+                                "status": "failed",
+                                "msg": to_text(
+                                    exc, errors="surrogate_then_replace"
+                                ).strip(),
+                            }
+                        )
+                        applied.extend(
+                            {"index": skipped, "status": "skipped"}
+                            for skipped in range(index + 1, len(edits))
+                        )
+                        if target == "candidate":
+                            # nothing of the transaction is left behind
+                            conn.discard_changes()
+                        module.fail_json(
+                            msg="edit-config failed for contents entry %d: %s"
+                            % (index, applied[index]["msg"]),
+                            contents=applied,
+                            changed=target != "candidate" and index > 0,
+                        )
+                    applied.append({"index": index, "status": "applied"})
+                if fragments:
+                    result["contents"] = applied
 
-            sanitized_before = sanitize_xml(before)
-            sanitized_after = sanitize_xml(after)
-            if sanitized_before != sanitized_after:
-                result["changed"] = True
+                if supports_commit and module.params["commit"]:
+                    with timings.phase("rpc"):
+                        after = to_text(
+                            conn.get_config(
+                                source="candidate", filter=compare_spec
+                            ),
+                            errors="surrogate_then_replace",
+                        ).strip()
+                    timings.count_reply(after)
+                    with timings.phase("commit"):
+                        if not module.check_mode:
+                            confirm_timeout = confirm if confirm > 0 else None
+                            confirmed_commit = (
+                                True if confirm_timeout else False
+                            )
+                            conn.commit(
+                                confirmed=confirmed_commit,
+                                timeout=confirm_timeout,
+                            )
+                        else:
+                            conn.discard_changes()
 
-            if result["changed"]:
-                if save and not module.check_mode:
-                    conn.copy_config(target, "startup")
-                if module._diff:
-                    result["diff"] = {
-                        "before": sanitized_before,
-                        "after": sanitized_after,
-                    }
+                if after is None:
+                    # without a commit, running only reflects an edit of running
+                    after_source = "running"
+                    if minimal and target == "candidate":
+                        after_source = "candidate"
+                    with timings.phase("rpc"):
+                        after = to_text(
+                            conn.get_config(
+                                source=after_source, filter=compare_spec
+                            ),
+                            errors="surrogate_then_replace",
+                        ).strip()
+                    timings.count_reply(after)
+
+                with timings.phase("diff"):
+                    if not xml_equal(
+                        before, after, unordered=module.params["ignore_order"]
+                    ):
+                        result["changed"] = True
+
+                if result["changed"]:
+                    if save and not module.check_mode:
+                        with timings.phase("commit"):
+                            conn.copy_config(target, "startup")
+                    if module._diff:
+                        with timings.phase("diff"):
+                            result["diff"] = {
+                                "before": sanitize_xml(before),
+                                "after": sanitize_xml(after),
+                            }
 
     except ConnectionError as e:
         module.fail_json(
@@ -613,8 +1066,11 @@ def main():
         )
     finally:
         if locked:
-            conn.unlock(target=target)
+            with timings.phase("unlock"):
+                conn.unlock(target=target)
 
+    if timings.enabled:
+        result["timings"] = timings.result()
     module.exit_json(**result)
 
 
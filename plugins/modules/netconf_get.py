@@ -43,7 +43,30 @@ options:
       on the value of C(source) option. The C(filter) value can be either XML string
       or XPath, if the filter is in XPath format the NETCONF server running on remote
       host should support xpath capability else it will result in an error.
-    type: dict
+    - Mutually exclusive with I(filters).
+    type: raw
+  filters:
+    description:
+    - A list of named filters fetched in one task, the results are returned in
+      C(output) and C(stdout) as dictionaries keyed by name.
+    - Subtree filters with different root elements are merged into a single RPC and
+      the reply is split by root element. XPath filters, and subtree filters with the
+      same root element as an earlier filter, are sent as separate RPCs one after
+      another over the same connection, within a single lock when one is requested.
+    - Mutually exclusive with I(filter).
+    type: list
+    elements: dict
+    suboptions:
+      name:
+        description:
+        - The key of the result in C(output) and C(stdout).
+        type: str
+        required: true
+      filter:
+        description:
+        - The subtree or XPath filter, as for the I(filter) option.
+        type: raw
+        required: true
   display:
     description:
     - Encoding scheme to use when serializing output from the device. The option I(json)
@@ -51,13 +74,34 @@ options:
       jxmlease to be installed on control node. The option I(pretty) is similar to
       received XML response but is using human readable format (spaces, new lines).
       The option value I(xml) is similar to received XML response but removes all
-      XML namespaces.
+      XML namespaces. The option I(native) converts the response to a dictionary
+      using xmltodict and I(dotted) flattens the response straight from the XML
+      into a dictionary keyed by dotted path, the same result as the native output
+      passed through the C(to_dotted) filter but without building the nested
+      dictionary.
+    - The I(native) and I(dotted) formats are converted from the parsed reply
+      rather than its serialized text, so C(@xmlns) and C(@xmlns:prefix) keys
+      are only reported where a namespace is first declared. An element that
+      declares a namespace again with the same URI as its parent no longer has
+      the C(@xmlns) key it had in earlier releases.
     type: str
     choices:
+    - dotted
     - json
     - native
     - pretty
     - xml
+  strip_namespaces:
+    description:
+    - Drop the namespace prefixes and C(@xmlns) declarations while the response is
+      converted for the I(native) and I(dotted) display formats, so keys are the
+      local element and attribute names. Namespaces are dropped as each element is
+      converted rather than by rewriting the result afterwards.
+    - With the I(json) and I(pretty) display formats, the namespaces are dropped
+      from the parsed reply in a single walk before it is serialized. The I(xml)
+      display format always drops them this way. C(stdout) keeps the namespaces.
+    type: bool
+    default: false
   lock:
     description:
     - Instructs the module to explicitly lock the datastore specified as C(source).
@@ -73,6 +117,78 @@ options:
     - never
     - always
     - if-supported
+  include_stdout:
+    description:
+    - Return the XML reply as C(stdout) along with the I(display) output. Set to
+      C(false) to only build and return the I(display) output, which avoids
+      serializing the reply for the I(native), I(dotted) and I(pretty) formats and
+      roughly halves the size of the result. C(stdout) is always returned when no
+      I(display) format is set.
+    type: bool
+    default: true
+  dest:
+    description:
+    - Write the XML reply to this file on the controller instead of returning it.
+      The reply is written as it is serialized and only its metadata is returned,
+      the C(size) and C(sha256) of the file and the number of C(elements) in the
+      reply. The file is only replaced when its content changes.
+    - A relative path is relative to the playbook or role directory, missing
+      directories are created.
+    - Mutually exclusive with I(display) and I(filters).
+    type: path
+  compress:
+    description:
+    - Compress the file written to I(dest) with gzip.
+    type: bool
+    default: false
+  paging:
+    description:
+    - Retrieve a subtree filter in pages, one RPC for each top-level container it
+      selects, and put the replies back together, so a large datastore is not read
+      in a single reply. The containers are the child elements of the root element
+      of the filter, for example I(interfaces) and I(protocols) in
+      C(<configuration><interfaces/><protocols/></configuration>).
+    - The pages are read one after the other within a single lock of the datastore
+      when I(lock) applies.
+    - With I(filters), each subtree filter is paged and no filters are merged.
+    type: bool
+    default: false
+  snapshot:
+    description:
+    - Keep the result of the task in a snapshot on the controller, keyed by
+      C(source), the filters and the output options, and compare the reply with it.
+    - When the reply is identical to the one in the snapshot, the task returns
+      C(changed=false) without converting the reply. With I(cached) the result is
+      read from the snapshot, with I(skip) only C(changed) and C(snapshot_sha256)
+      are returned.
+    - When the reply differs, or there is no snapshot, the result is built, saved
+      to the snapshot and returned with C(changed=true).
+    - Mutually exclusive with I(dest).
+    type: str
+    default: never
+    choices:
+    - never
+    - cached
+    - skip
+  snapshot_dir:
+    description:
+    - The directory holding the snapshots, a directory is created below it for each
+      inventory host. A relative path is relative to the playbook or role directory.
+    - Defaults to C(~/.ansible/netconf_snapshots).
+    type: path
+  timings:
+    description:
+    - Return the seconds spent in each phase of the task as C(timings), with the
+      number of bytes and elements in the replies.
+    type: bool
+    default: false
+  refresh_capabilities:
+    description:
+    - The capabilities of the NETCONF server are cached for the lifetime of the
+      persistent connection, so tasks after the first one do not ask for them again.
+      Set to C(true) to ask the connection and update the cache.
+    type: bool
+    default: false
 requirements:
 - ncclient (>=v0.5.2)
 - jxmlease
@@ -105,6 +221,57 @@ EXAMPLES = """
     filter: <netconf-state xmlns="urn:ietf:params:xml:ns:yang:ietf-netconf-monitoring"><schemas><schema/></schemas></netconf-state>
     lock: never
 
+- name: Get the interface configuration as a flat dictionary of dotted paths
+  ansible.netcommon.netconf_get:
+    source: running
+    display: dotted
+    filter: <System xmlns="http://cisco.com/ns/yang/cisco-nx-os-device"><intf-items/></System>
+
+- name: Get the interface configuration without namespace prefixes
+  ansible.netcommon.netconf_get:
+    source: running
+    display: native
+    strip_namespaces: true
+    filter: <System xmlns="http://cisco.com/ns/yang/cisco-nx-os-device"><intf-items/></System>
+
+- name: Get the interfaces and VLANs with a single RPC
+  ansible.netcommon.netconf_get:
+    source: running
+    display: native
+    filters:
+    - name: interfaces
+      filter: <interfaces xmlns="urn:ietf:params:xml:ns:yang:ietf-interfaces"/>
+    - name: vlans
+      filter: <vlans xmlns="http://openconfig.net/yang/vlan"/>
+
+- name: Get the interface configuration as native data only, without stdout
+  ansible.netcommon.netconf_get:
+    source: running
+    display: native
+    include_stdout: false
+    filter: <System xmlns="http://cisco.com/ns/yang/cisco-nx-os-device"><intf-items/></System>
+
+- name: Save a compressed snapshot of the running configuration
+  ansible.netcommon.netconf_get:
+    source: running
+    dest: "snapshots/{{ inventory_hostname }}.xml.gz"
+    compress: true
+
+- name: Read a large configuration one top-level container at a time
+  ansible.netcommon.netconf_get:
+    source: running
+    paging: true
+    filter: <configuration><interfaces/><protocols/><routing-instances/></configuration>
+
+- name: Poll the interface configuration, only converting it when it changes
+  ansible.netcommon.netconf_get:
+    source: running
+    display: native
+    include_stdout: false
+    snapshot: cached
+    filter: <System xmlns="http://cisco.com/ns/yang/cisco-nx-os-device"><intf-items/></System>
+  register: interfaces
+
 - name: get schema list using xpath
   ansible.netcommon.netconf_get:
     display: xml
@@ -135,20 +302,63 @@ EXAMPLES = """
 RETURN = """
 stdout:
   description: The raw XML string containing configuration or state data
-               received from the underlying ncclient library.
-  returned: always apart from low-level errors (such as action plugin)
+               received from the underlying ncclient library, a dictionary
+               of them keyed by name with I(filters).
+  returned: unless I(include_stdout) is C(false) and a I(display) format is set,
+            or I(dest) is set, apart from low-level errors (such as action plugin)
   type: str
   sample: '...'
 stdout_lines:
   description: The value of stdout split into a list
-  returned: always apart from low-level errors (such as action plugin)
+  returned: when stdout is returned as a string
   type: list
   sample: ['...', '...']
+dest:
+  description: The path of the file the reply was written to
+  returned: when I(dest) is set
+  type: str
+  sample: /playbooks/snapshots/nxos101.xml.gz
+size:
+  description: The size of the file written to I(dest) in bytes
+  returned: when I(dest) is set
+  type: int
+  sample: 1048576
+sha256:
+  description: The sha256 digest of the file written to I(dest)
+  returned: when I(dest) is set
+  type: str
+  sample: 9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08
+elements:
+  description: The number of XML elements in the reply written to I(dest)
+  returned: when I(dest) is set
+  type: int
+  sample: 12000
+snapshot_sha256:
+  description: The sha256 digest of the reply compared with the snapshot
+  returned: when I(snapshot) is not I(never)
+  type: str
+  sample: 9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08
+timings:
+  description:
+  - The seconds spent in each phase of the task, C(lock), C(rpc), C(unlock),
+    C(hash), C(serialize) and C(convert), only the phases the task went through
+    are returned.
+  - C(bytes) and C(elements) count the serialized size and the elements of the
+    replies.
+  returned: when I(timings) is set
+  type: dict
+  sample:
+    rpc: 1.248311
+    serialize: 0.040122
+    convert: 0.180455
+    bytes: 2480012
+    elements: 61234
 output:
   description: Based on the value of display option will return either the set of
                transformed XML to JSON format from the RPC response with type dict
                or pretty XML string response (human-readable) or response with
-               namespace removed from XML string.
+               namespace removed from XML string, a dictionary of them keyed by
+               name with I(filters).
   returned: when the display format is selected as JSON it is returned as dict type, if the
             display format is xml or pretty pretty it is returned as a string apart from low-level
             errors (such as action plugin).
@@ -174,17 +384,31 @@ except ImportError:
         from xml.etree.ElementTree import ParseError as XMLSyntaxError
 
 from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.connection import ConnectionError
 from ansible_collections.ansible.netcommon.plugins.module_utils.network.netconf.netconf import (
-    get_capabilities,
     get_config,
     get,
-)
-from ansible_collections.ansible.netcommon.plugins.module_utils.network.common.netconf import (
-    remove_namespaces,
+    lock_configuration,
+    unlock_configuration,
 )
 from ansible.module_utils._text import to_text, to_native
+from ansible_collections.cidrblock.dev.plugins.module_utils.netconf_utils import (
+    cached_capabilities,
+    filter_type_of,
+    load_snapshot,
+    merge_reply,
+    plan_filters,
+    replies_sha256,
+    save_snapshot,
+    snapshot_path,
+    split_reply,
+    Timings,
+    write_reply,
+)
 from ansible_collections.cidrblock.dev.plugins.module_utils.xml_utils import (
     ensure_xml_or_str,
+    strip_tree_namespaces,
+    xml_to_dotted,
     xml_to_native,
 )
 
@@ -196,35 +420,128 @@ except ImportError:
     HAS_JXMLEASE = False
 
 
+XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8"?>'
+
+
+def format_response(
+    response, display, strip_namespaces, stdout=True, timings=None
+):
+    """Convert a reply to the display format, serializing it only when
+    the XML string is returned or the display format starts from it
+
+    :param response: The reply element
+    :param display: The display option
+    :param strip_namespaces: The strip_namespaces option
+    :param stdout: The include_stdout option
+    :param timings: The Timings of the task
+    :return: A tuple of (XML string or None, output)
+    """
+    timings = timings or Timings(enabled=False)
+    xml_resp = None
+    if stdout or display is None or (
+        display == "json" and not strip_namespaces
+    ):
+        with timings.phase("serialize"):
+            xml_resp = to_text(tostring(response))
+    output = None
+
+    with timings.phase("convert"):
+        # the reply is serialized above when it is returned, so the tree
+        # can be changed in place
+        if display == "xml" or (
+            strip_namespaces and display in ("json", "pretty")
+        ):
+            strip_tree_namespaces(response)
+        if display == "xml":
+            output = XML_DECLARATION + to_text(tostring(response))
+        elif display == "json":
+            text = xml_resp
+            if strip_namespaces:
+                text = to_text(tostring(response))
+            try:
+                output = jxmlease.parse(text)
+            except Exception:
+                raise ValueError(text)
+
+        elif display == "pretty":
+            output = to_text(tostring(response, pretty_print=True))
+        elif display == "native":
+            output = xml_to_native(
+                response, "display", strip_namespaces=strip_namespaces
+            )
+        elif display == "dotted":
+            output = xml_to_dotted(
+                response, "display", strip_namespaces=strip_namespaces
+            )
+    return xml_resp, output
+
+
 def main():
     """entry point for module execution"""
     argument_spec = dict(
         source=dict(choices=["running", "candidate", "startup"]),
         filter=dict(type="raw"),
-        display=dict(choices=["json", "native", "pretty", "xml"]),
+        filters=dict(
+            type="list",
+            elements="dict",
+            options=dict(
+                name=dict(type="str", required=True),
+                filter=dict(type="raw", required=True),
+            ),
+        ),
+        display=dict(choices=["dotted", "json", "native", "pretty", "xml"]),
+        strip_namespaces=dict(type="bool", default=False),
+        include_stdout=dict(type="bool", default=True),
+        dest=dict(type="path"),
+        compress=dict(type="bool", default=False),
+        paging=dict(type="bool", default=False),
+        timings=dict(type="bool", default=False),
+        snapshot=dict(default="never", choices=["never", "cached", "skip"]),
+        snapshot_dir=dict(type="path"),
+        refresh_capabilities=dict(type="bool", default=False),
         lock=dict(
             default="never", choices=["never", "always", "if-supported"]
         ),
     )
 
     module = AnsibleModule(
-        argument_spec=argument_spec, supports_check_mode=True
+        argument_spec=argument_spec,
+        mutually_exclusive=[
+            ("filter", "filters"),
+            ("dest", "display"),
+            ("dest", "filters"),
+            ("dest", "snapshot"),
+        ],
+        supports_check_mode=True,
     )
 
-    capabilities = get_capabilities(module)
+    capabilities = cached_capabilities(
+        module, module.params["refresh_capabilities"]
+    )
     operations = capabilities["device_operations"]
 
     source = module.params["source"]
-    filter, tipe = ensure_xml_or_str(module.params["filter"], "filter")
-    if tipe == "xml":
-        filter_type = "subtree"
-    elif tipe == "str":
-        filter_type = "xpath"
+    if module.params["filters"]:
+        entries = [
+            (entry["name"], entry["filter"])
+            for entry in module.params["filters"]
+        ]
+        names = [name for name, _filter in entries]
+        if len(set(names)) != len(names):
+            module.fail_json(msg="filter names must be unique")
     else:
-        filter_type = tipe
+        entries = [(None, module.params["filter"])]
+
+    filters = []
+    for name, value in entries:
+        filter, tipe, root = ensure_xml_or_str(value, "filter")
+        filters.append((name, filter_type_of(tipe), filter, root))
 
     lock = module.params["lock"]
     display = module.params["display"]
+    strip_namespaces = module.params["strip_namespaces"]
+    # without a display format the XML string is the only result
+    stdout = module.params["include_stdout"] or display is None
 
     if source == "candidate" and not operations.get("supports_commit", False):
         module.fail_json(
@@ -234,11 +551,14 @@ def main():
     if source == "startup" and not operations.get("supports_startup", False):
         module.fail_json(msg="startup source is not supported on this device")
 
-    if filter_type == "xpath" and not operations.get("supports_xpath", False):
-        module.fail_json(
-            msg="filter value '%s' of type xpath is not supported on this device"
-            % filter
-        )
+    for _name, filter_type, filter, _root in filters:
+        if filter_type == "xpath" and not operations.get(
+            "supports_xpath", False
+        ):
+            module.fail_json(
+                msg="filter value '%s' of type xpath is not supported on this device"
+                % filter
+            )
 
     # If source is None, NETCONF <get> operation is issued, reading config/state data
     # from the running datastore. The python expression "(source or 'running')" results
@@ -264,31 +584,114 @@ def main():
             "It can be installed using `pip install jxmlease`"
         )
 
-    filter_spec = (filter_type, filter) if filter_type else None
-
-    if source is not None:
-        response = get_config(module, source, filter_spec, execute_lock)
-    else:
-        response = get(module, filter_spec, execute_lock)
-
-    xml_resp = to_text(tostring(response))
-    output = None
-
-    if display == "xml":
-        output = remove_namespaces(xml_resp)
-    elif display == "json":
+    if module.params["paging"] and not any(
+        filter_type == "subtree"
+        for _name, filter_type, _filter, _root in filters
+    ):
+        module.fail_json(msg="paging requires a subtree filter")
+
+    rpcs = plan_filters(filters, module.params["paging"])
+    timings = Timings(module.params["timings"])
+
+    replies = {}
+
+    def fetch(filter_spec, keys):
+        with timings.phase("rpc"):
+            if source is not None:
+                response = get_config(module, source, filter_spec)
+            else:
+                response = get(module, filter_spec)
+        timings.count_reply(response)
+        # pages are merged as they arrive, so only one reply is pending
+        for name, reply in split_reply(response, keys).items():
+            if name in replies:
+                merge_reply(replies[name], reply)
+            else:
+                replies[name] = reply
+
+    # one lock around all of the RPCs, so the results are consistent
+    try:
+        if execute_lock:
+            with timings.phase("lock"):
+                lock_configuration(module, target=source or "running")
         try:
-            output = jxmlease.parse(xml_resp)
-        except Exception:
-            raise ValueError(xml_resp)
-
-    elif display == "pretty":
-        output = to_text(tostring(response, pretty_print=True))
-    elif display == "native":
-        output = xml_to_native(tostring(response), "display")
-
-    result = {"stdout": xml_resp, "output": output}
+            for spec, keys in rpcs:
+                fetch(spec, keys)
+        finally:
+            if execute_lock:
+                with timings.phase("unlock"):
+                    unlock_configuration(module, target=source or "running")
+    except ConnectionError as exc:
+        module.fail_json(
+            msg=to_text(exc, errors="surrogate_then_replace").strip()
+        )
 
+    snapshot = module.params["snapshot"]
+    if snapshot != "never":
+        if not module.params["snapshot_dir"]:
+            module.fail_json(msg="snapshot_dir is required with snapshot")
+        snapshot_file = snapshot_path(
+            module.params["snapshot_dir"],
+            [
+                source,
+                [
+                    (name, filter_type, filter)
+                    for name, filter_type, filter, _root in filters
+                ],
+                display,
+                strip_namespaces,
+                stdout,
+            ],
+        )
+        with timings.phase("hash"):
+            digest = replies_sha256(
+                [replies[name] for name, _filter in entries]
+            )
+        previous = load_snapshot(snapshot_file)
+        if previous is not None and previous["sha256"] == digest:
+            result = previous["result"] if snapshot == "cached" else {}
+            result.update({"changed": False, "snapshot_sha256": digest})
+            if timings.enabled:
+                result["timings"] = timings.result()
+            module.exit_json(**result)
+
+    if module.params["dest"]:
+        with timings.phase("serialize"):
+            result = write_reply(
+                module,
+                replies[None],
+                module.params["dest"],
+                module.params["compress"],
+            )
+    elif not module.params["filters"]:
+        xml_resp, output = format_response(
+            replies[None], display, strip_namespaces, stdout, timings
+        )
+        result = {"output": output}
+        if stdout:
+            result["stdout"] = xml_resp
+    else:
+        result = {"output": {}}
+        if stdout:
+            result["stdout"] = {}
+        for name, _filter in entries:
+            xml_resp, output = format_response(
+                replies[name], display, strip_namespaces, stdout, timings
+            )
+            result["output"][name] = output
+            if stdout:
+                result["stdout"][name] = xml_resp
+
+    if snapshot != "never":
+        if not module.check_mode:
+            try:
+                save_snapshot(snapshot_file, digest, result)
+            except (IOError, OSError) as exc:
+                module.fail_json(msg=to_text(exc))
+        result.update({"changed": True, "snapshot_sha256": digest})
+
+    if timings.enabled:
+        result["timings"] = timings.result()
     module.exit_json(**result)
 
 
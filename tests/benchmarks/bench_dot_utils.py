@@ -0,0 +1,105 @@
+# (c) 2020 Ansible Project
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+"""
+Throughput of the dot_utils flattening engine on NX-OS shaped trees.
+
+Run from a collection checkout on the PYTHONPATH, e.g.:
+
+    PYTHONPATH=/path/to/collections python tests/benchmarks/bench_dot_utils.py
+"""
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import sys
+import timeit
+
+from ansible.module_utils.common._collections_compat import (
+    Mapping,
+    MutableMapping,
+)
+
+from ansible_collections.cidrblock.dev.plugins.module_utils.dot_utils import (
+    from_dotted,
+    to_dotted,
+)
+
+SIZES = (10000, 100000, 1000000)
+
+# leaves per interface in the generated tree
+LEAVES = ("id", "descr", "mtu", "adminSt", "speed", "duplex", "layer", "mode")
+
+
+def recursive_to_dotted(nested_json):
+    """The original recursive implementation, kept as the baseline"""
+    out = {}
+
+    def flatten(data, name=""):
+        if isinstance(data, (dict, Mapping, MutableMapping)):
+            for k, val in data.items():
+                if name:
+                    nname = name + ".{}".format(k)
+                else:
+                    nname = k
+                flatten(val, nname)
+        elif isinstance(data, list):
+            for idx, val in enumerate(data):
+                flatten(val, "{}[{}]".format(name, idx))
+        else:
+            out[name] = data
+
+    flatten(nested_json)
+    return out
+
+
+def build_tree(leaves):
+    """Build a System tree with roughly the requested number of leaves"""
+    interfaces = []
+    for idx in range(leaves // (len(LEAVES) + 2)):
+        intf = dict((leaf, "{}{}".format(leaf, idx)) for leaf in LEAVES)
+        intf["rtvrfMbr-items"] = {"tDn": "/System/inst-items/Inst-list"}
+        intf["vlans"] = [idx]
+        interfaces.append(intf)
+    return {
+        "data": {
+            "System": {
+                "@xmlns": "http://cisco.com/ns/yang/cisco-nx-os-device",
+                "intf-items": {"phys-items": {"PhysIf-list": interfaces}},
+            }
+        }
+    }
+
+
+def per_second(func, arg, count):
+    """Leaves processed per second, best of three"""
+    number = max(1, 1000000 // count)
+    best = min(timeit.repeat(lambda: func(arg), number=number, repeat=3))
+    return count * number / best
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    print(
+        "{:>10} {:>14} {:>14} {:>8} {:>14}".format(
+            "leaves", "recursive/s", "iterative/s", "speedup", "from_dotted/s"
+        )
+    )
+    for size in sizes:
+        tree = build_tree(size)
+        dotted = to_dotted(tree)
+        assert dotted == recursive_to_dotted(tree)
+        assert from_dotted(dotted) == tree
+        count = len(dotted)
+        old = per_second(recursive_to_dotted, tree, count)
+        new = per_second(to_dotted, tree, count)
+        back = per_second(from_dotted, dotted, count)
+        print(
+            "{:>10} {:>14.0f} {:>14.0f} {:>7.2f}x {:>14.0f}".format(
+                count, old, new, new / old, back
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
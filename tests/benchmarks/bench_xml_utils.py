@@ -0,0 +1,161 @@
+# (c) 2020 Ansible Project
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+"""
+Throughput of the xml_utils conversions on NX-OS shaped NETCONF replies.
+
+Run from a collection checkout on the PYTHONPATH, e.g.:
+
+    PYTHONPATH=/path/to/collections python tests/benchmarks/bench_xml_utils.py
+"""
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import sys
+import timeit
+
+import xmltodict
+
+from ansible_collections.ansible.netcommon.plugins.module_utils.network.netconf.netconf import (
+    sanitize_xml,
+)
+from ansible_collections.cidrblock.dev.plugins.module_utils.dot_utils import (
+    to_dotted,
+)
+from ansible_collections.cidrblock.dev.plugins.module_utils.xml_utils import (
+    iter_xml_dotted,
+    parse_xml,
+    select_xml,
+    xml_equal,
+)
+
+SIZES = (1000, 10000, 50000)
+
+INTERFACE = """
+          <PhysIf-list>
+            <id>eth1/{idx}</id>
+            <descr>interface {idx}</descr>
+            <mtu>9216</mtu>
+            <adminSt>up</adminSt>
+            <layer>Layer2</layer>
+            <rtvrfMbr-items>
+              <tDn>/System/inst-items/Inst-list[name='default']</tDn>
+            </rtvrfMbr-items>
+          </PhysIf-list>"""
+
+REPLY = """<?xml version="1.0" encoding="UTF-8"?>
+<rpc-reply xmlns="urn:ietf:params:xml:ns:netconf:base:1.0" message-id="101">
+  <data>
+    <System xmlns="http://cisco.com/ns/yang/cisco-nx-os-device">
+      <intf-items>
+        <phys-items>{interfaces}
+        </phys-items>
+      </intf-items>
+    </System>
+  </data>
+</rpc-reply>
+"""
+
+
+def build_reply(interfaces):
+    """Build a get-config reply with the requested number of interfaces"""
+    return REPLY.format(
+        interfaces="".join(
+            INTERFACE.format(idx=idx) for idx in range(interfaces)
+        )
+    )
+
+
+def best(func, arg):
+    """Seconds per call, best of three"""
+    return min(timeit.repeat(lambda: func(arg), number=1, repeat=3))
+
+
+def xmltodict_native(reply):
+    return xmltodict.parse(reply, dict_constructor=dict)
+
+
+def native_dotted(reply):
+    return to_dotted(xmltodict.parse(reply, dict_constructor=dict))
+
+
+def direct_dotted(reply):
+    return dict(iter_xml_dotted(reply))
+
+
+def native_select(reply):
+    system = parse_xml(reply)["rpc-reply"]["data"]["System"]
+    return [
+        {"PhysIf-list": intf}
+        for intf in system["intf-items"]["phys-items"]["PhysIf-list"]
+        if intf["id"] == "eth1/5"
+    ]
+
+
+def xpath_select(reply):
+    return select_xml(
+        reply,
+        "//nx:PhysIf-list[nx:id='eth1/5']",
+        {"nx": "http://cisco.com/ns/yang/cisco-nx-os-device"},
+    )
+
+
+def sanitized_equal(reply):
+    return sanitize_xml(reply) == sanitize_xml(changed_reply(reply))
+
+
+def structural_equal(reply):
+    return xml_equal(reply, changed_reply(reply))
+
+
+def changed_reply(reply):
+    """The reply with the first interface changed, cached per reply"""
+    if reply not in CHANGED:
+        CHANGED[reply] = reply.replace("<mtu>9216", "<mtu>1500", 1)
+    return CHANGED[reply]
+
+
+CHANGED = {}
+
+
+def compare(label, old_func, new_func, reply):
+    """Print the best time of both conversions and the speedup"""
+    assert old_func(reply) == new_func(reply)
+    old = best(old_func, reply)
+    new = best(new_func, reply)
+    print(
+        "{:>10} {:>10} {:>10.3f} {:>10.3f} {:>7.2f}x".format(
+            label, len(reply), old, new, old / new
+        )
+    )
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    for title, old_func, new_func in (
+        ("native: xmltodict vs lxml", xmltodict_native, parse_xml),
+        (
+            "dotted: xmltodict + to_dotted vs direct",
+            native_dotted,
+            direct_dotted,
+        ),
+        ("select: lxml native vs xpath", native_select, xpath_select),
+        (
+            "changed: sanitize_xml vs xml_equal",
+            sanitized_equal,
+            structural_equal,
+        ),
+    ):
+        print(title)
+        print(
+            "{:>10} {:>10} {:>10} {:>10} {:>8}".format(
+                "interfaces", "bytes", "old (s)", "new (s)", "speedup"
+            )
+        )
+        for size in sizes:
+            compare(size, old_func, new_func, build_reply(size))
+
+
+if __name__ == "__main__":
+    main()
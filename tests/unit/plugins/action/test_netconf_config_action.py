@@ -0,0 +1,95 @@
+# (c) 2020 Ansible Project
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import os
+import shutil
+import tempfile
+
+from ansible.playbook.task import Task
+from ansible.template import Templar
+from ansible_collections.ansible.netcommon.tests.unit.compat import unittest
+from ansible_collections.ansible.netcommon.tests.unit.compat.mock import (
+    MagicMock,
+    patch,
+)
+from ansible_collections.ansible.netcommon.tests.unit.mock.loader import (
+    DictDataLoader,
+)
+from ansible_collections.cidrblock.dev.plugins.action.netconf_config import (
+    ActionModule,
+)
+
+
+class TestNetconfConfig(unittest.TestCase):
+    def setUp(self):
+        task = MagicMock(Task)
+        task._role = None
+        play_context = MagicMock()
+        play_context.check_mode = True
+        play_context.connection = "ansible.netcommon.netconf"
+        connection = MagicMock()
+        self._basedir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self._basedir)
+        fake_loader = DictDataLoader({})
+        fake_loader.get_basedir = MagicMock(return_value=self._basedir)
+        templar = Templar(loader=fake_loader)
+        self._plugin = ActionModule(
+            task=task,
+            connection=connection,
+            play_context=play_context,
+            loader=fake_loader,
+            templar=templar,
+            shared_loader_obj=None,
+        )
+        self._plugin._task.action = "netconf_config"
+
+    @patch(
+        "ansible_collections.ansible.netcommon.plugins.action.netconf."
+        "ActionModule.run"
+    )
+    def test_running_config_relative(self, run):
+        """Check a relative running_config is resolved like netconf_get dest"""
+        run.return_value = {"changed": True}
+        os.makedirs(os.path.join(self._basedir, "snapshots"))
+        path = os.path.join(self._basedir, "snapshots", "r1.xml.gz")
+        open(path, "wb").close()
+        self._plugin._task.args = {
+            "simulate": True,
+            "running_config": "snapshots/r1.xml.gz",
+        }
+        self.assertEqual(self._plugin.run(task_vars={}), {"changed": True})
+        self.assertEqual(self._plugin._task.args["running_config"], path)
+
+    @patch(
+        "ansible_collections.ansible.netcommon.plugins.action.netconf."
+        "ActionModule.run"
+    )
+    def test_running_config_missing(self, run):
+        """Check a path that does not exist fails before the module runs"""
+        self._plugin._task.args = {"running_config": "snapshots/r1.xml.gz"}
+        result = self._plugin.run(task_vars={})
+        self.assertTrue(result["failed"])
+        self.assertEqual(
+            result["msg"],
+            "running_config file not found: %s"
+            % os.path.join(self._basedir, "snapshots", "r1.xml.gz"),
+        )
+        run.assert_not_called()
+
+    @patch(
+        "ansible_collections.ansible.netcommon.plugins.action.netconf."
+        "ActionModule.run"
+    )
+    def test_running_config_markup(self, run):
+        """Check XML and dict values are passed on untouched"""
+        run.return_value = {"changed": False}
+        for running_config in ("  <data/>", {"data": None}):
+            self._plugin._task.args = {"running_config": running_config}
+            self._plugin.run(task_vars={})
+            self.assertEqual(
+                self._plugin._task.args["running_config"], running_config
+            )
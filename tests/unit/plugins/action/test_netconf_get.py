@@ -0,0 +1,105 @@
+# (c) 2020 Ansible Project
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import os
+import shutil
+import tempfile
+
+from ansible.playbook.task import Task
+from ansible.template import Templar
+from ansible_collections.ansible.netcommon.tests.unit.compat import unittest
+from ansible_collections.ansible.netcommon.tests.unit.compat.mock import (
+    MagicMock,
+    patch,
+)
+from ansible_collections.ansible.netcommon.tests.unit.mock.loader import (
+    DictDataLoader,
+)
+from ansible_collections.cidrblock.dev.plugins.action.netconf_get import (
+    ActionModule,
+)
+
+
+class TestNetconfGet(unittest.TestCase):
+    def setUp(self):
+        task = MagicMock(Task)
+        task._role = None
+        play_context = MagicMock()
+        play_context.check_mode = False
+        play_context.connection = "ansible.netcommon.netconf"
+        connection = MagicMock()
+        self._basedir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self._basedir)
+        fake_loader = DictDataLoader({})
+        fake_loader.get_basedir = MagicMock(return_value=self._basedir)
+        templar = Templar(loader=fake_loader)
+        self._plugin = ActionModule(
+            task=task,
+            connection=connection,
+            play_context=play_context,
+            loader=fake_loader,
+            templar=templar,
+            shared_loader_obj=None,
+        )
+        self._plugin._task.action = "netconf_get"
+
+    @patch(
+        "ansible_collections.ansible.netcommon.plugins.action.netconf."
+        "ActionModule.run"
+    )
+    def test_dest_relative(self, run):
+        """Check a relative dest is resolved and its directory created"""
+        run.return_value = {"changed": True}
+        self._plugin._task.args = {"dest": "snapshots/r1.xml"}
+        self.assertEqual(self._plugin.run(task_vars={}), {"changed": True})
+        dest = os.path.join(self._basedir, "snapshots", "r1.xml")
+        self.assertEqual(self._plugin._task.args["dest"], dest)
+        self.assertTrue(os.path.isdir(os.path.dirname(dest)))
+
+    @patch(
+        "ansible_collections.ansible.netcommon.plugins.action.netconf."
+        "ActionModule.run"
+    )
+    def test_dest_not_set(self, run):
+        """Check the task arguments are untouched without dest"""
+        run.return_value = {"changed": False}
+        self._plugin._task.args = {"display": "native"}
+        self._plugin.run(task_vars={})
+        self.assertEqual(self._plugin._task.args, {"display": "native"})
+
+    @patch(
+        "ansible_collections.ansible.netcommon.plugins.action.netconf."
+        "ActionModule.run"
+    )
+    def test_snapshot_dir(self, run):
+        """Check the snapshot directory is resolved for the host"""
+        run.return_value = {"changed": False}
+        self._plugin._task.args = {
+            "snapshot": "cached",
+            "snapshot_dir": "snapshots",
+        }
+        self._plugin.run(task_vars={"inventory_hostname": "r1"})
+        self.assertEqual(
+            self._plugin._task.args["snapshot_dir"],
+            os.path.join(self._basedir, "snapshots", "r1"),
+        )
+
+    @patch(
+        "ansible_collections.ansible.netcommon.plugins.action.netconf."
+        "ActionModule.run"
+    )
+    def test_snapshot_dir_default(self, run):
+        """Check the snapshot directory defaults below the home directory"""
+        run.return_value = {"changed": False}
+        self._plugin._task.args = {"snapshot": "skip"}
+        self._plugin.run(task_vars={"inventory_hostname": "r1"})
+        self.assertEqual(
+            self._plugin._task.args["snapshot_dir"],
+            os.path.join(
+                os.path.expanduser("~/.ansible/netconf_snapshots"), "r1"
+            ),
+        )
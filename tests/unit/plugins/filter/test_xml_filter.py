@@ -0,0 +1,174 @@
+# (c) 2020 Ansible Project
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import os
+import shutil
+import tempfile
+
+from ansible.errors import AnsibleFilterError
+from ansible_collections.ansible.netcommon.tests.unit.compat import unittest
+from ansible_collections.ansible.netcommon.tests.unit.compat.mock import (
+    patch,
+)
+from ansible_collections.cidrblock.dev.plugins.filter import xml_filter
+from ansible_collections.cidrblock.dev.plugins.filter.xml_filter import (
+    from_xml,
+    from_xml_cache_info,
+    to_xml,
+    xml_select,
+)
+from ansible_collections.cidrblock.dev.plugins.module_utils.xml_utils import (
+    HAS_LXML,
+)
+
+DOC = '<System xmlns="urn:nxos"><a>1</a><a>2</a></System>'
+
+NATIVE = {"System": {"@xmlns": "urn:nxos", "a": ["1", "2"]}}
+
+
+class TestXmlFilter(unittest.TestCase):
+    def setUp(self):
+        self._cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self._cache_dir)
+        local_tmp = patch.object(
+            xml_filter.C, "DEFAULT_LOCAL_TMP", self._cache_dir
+        )
+        local_tmp.start()
+        self.addCleanup(local_tmp.stop)
+
+    def test_from_xml(self):
+        """Check a document is converted without the cache"""
+        self.assertEqual(from_xml(DOC), NATIVE)
+        self.assertEqual(from_xml_cache_info()["misses"], 0)
+
+    def test_from_xml_item_depth(self):
+        """Check the items at a depth are returned as a list"""
+        self.assertEqual(from_xml(DOC, item_depth=2), [{"a": "1"}, {"a": "2"}])
+
+    def test_from_xml_cache(self):
+        """Check identical documents are parsed once"""
+        first = from_xml(DOC, cache=True)
+        second = from_xml(DOC, cache=True)
+        self.assertEqual(first, NATIVE)
+        self.assertEqual(second, NATIVE)
+        self.assertEqual(
+            from_xml_cache_info(),
+            {"hits": 1, "misses": 1, "size": 1, "maxsize": 32},
+        )
+
+    def test_from_xml_cache_shared(self):
+        """Check a document parsed by one process is read by the others"""
+        from_xml(DOC, cache=True)
+        with patch.object(xml_filter, "parse_xml") as parse_xml:
+            pid = os.fork()
+            if not pid:
+                # the child exits with the number of parses it made
+                status = 255
+                try:
+                    if from_xml(DOC, cache=True) == NATIVE:
+                        status = parse_xml.call_count
+                finally:
+                    os._exit(status)
+            _pid, status = os.waitpid(pid, 0)
+        self.assertEqual(os.WEXITSTATUS(status), 0)
+        self.assertEqual(
+            from_xml_cache_info(),
+            {"hits": 1, "misses": 1, "size": 1, "maxsize": 32},
+        )
+
+    def test_from_xml_cache_run(self):
+        """Check the cache is kept in the local temporary directory of the
+        run and its counters do not grow with the number of calls
+        """
+        for _idx in range(200):
+            from_xml(DOC, cache=True)
+        directory = os.path.join(self._cache_dir, "from_xml_cache")
+        self.assertEqual(len(os.listdir(directory)), 2)
+        self.assertLess(os.path.getsize(os.path.join(directory, "stats")), 40)
+        self.assertEqual(from_xml_cache_info()["hits"], 199)
+
+    def test_from_xml_cache_copy(self):
+        """Check a cached result is not changed through a returned copy"""
+        first = from_xml(DOC, cache=True)
+        first["System"]["a"].append("3")
+        self.assertEqual(from_xml(DOC, cache=True), NATIVE)
+
+    def test_from_xml_cache_bounded(self):
+        """Check the least recently used document is evicted"""
+        for idx in range(xml_filter.CACHE_SIZE + 1):
+            from_xml("<a>{}</a>".format(idx), cache=True)
+        from_xml("<a>0</a>", cache=True)
+        info = from_xml_cache_info()
+        self.assertEqual(info["size"], xml_filter.CACHE_SIZE)
+        self.assertEqual(info["hits"], 0)
+
+    def test_from_xml_cache_not_bool(self):
+        """Check the cache option is validated"""
+        with self.assertRaises(AnsibleFilterError) as error:
+            from_xml(DOC, cache="yes")
+        self.assertIn(
+            "'cache' is required to be a boolean", str(error.exception)
+        )
+
+    def test_from_xml_strip_namespaces_cache(self):
+        """Check stripped and full results are cached separately"""
+        stripped = {"System": {"a": ["1", "2"]}}
+        self.assertEqual(
+            from_xml(DOC, cache=True, strip_namespaces=True), stripped
+        )
+        self.assertEqual(from_xml(DOC, cache=True), NATIVE)
+        self.assertEqual(
+            from_xml(DOC, cache=True, strip_namespaces=True), stripped
+        )
+        self.assertEqual(from_xml_cache_info()["hits"], 1)
+
+    def test_to_xml_dest(self):
+        """Check a document is written to a file rather than returned"""
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        dest = os.path.join(tmpdir, "config.xml")
+        self.assertEqual(to_xml(NATIVE, full_doc=True, dest=dest), dest)
+        with open(dest) as fhand:
+            self.assertEqual(fhand.read(), to_xml(NATIVE, full_doc=True))
+
+    @unittest.skipUnless(HAS_LXML, "lxml is not installed")
+    def test_xml_select(self):
+        """Check only the matched nodes are converted"""
+        namespaces = {"nx": "urn:nxos"}
+        self.assertEqual(
+            xml_select(DOC, "/nx:System/nx:a[2]", namespaces),
+            [{"a": "2"}],
+        )
+        self.assertEqual(
+            xml_select(DOC, "//nx:a/text()", namespaces), ["1", "2"]
+        )
+        self.assertEqual(
+            xml_select(
+                DOC, "//*[local-name()='System']", strip_namespaces=True
+            ),
+            [{"System": {"a": ["1", "2"]}}],
+        )
+        self.assertEqual(xml_select(DOC, "count(//nx:a)", namespaces), 2.0)
+
+    def test_xml_select_invalid(self):
+        """Check a bad expression is reported as a filter error"""
+        with self.assertRaises(AnsibleFilterError) as error:
+            xml_select(DOC, "//[")
+        self.assertIn("'xml_select' filter plugin", str(error.exception))
+
+    def test_from_xml_path(self):
+        """Check a path is parsed and cached by the content of the file"""
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, "backup.xml")
+        with open(path, "w") as fhand:
+            fhand.write(DOC)
+        self.assertEqual(from_xml(path, cache=True), NATIVE)
+        with open(path, "w") as fhand:
+            fhand.write("<a>1</a>")
+        self.assertEqual(from_xml(path, cache=True), {"a": "1"})
+        self.assertEqual(from_xml_cache_info()["misses"], 2)
@@ -0,0 +1,144 @@
+# (c) 2020 Ansible Project
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import sys
+
+from ansible_collections.ansible.netcommon.tests.unit.compat import unittest
+from ansible_collections.cidrblock.dev.plugins.module_utils.dot_utils import (
+    DottedIndex,
+    from_dotted,
+    iter_dotted,
+    to_dotted,
+)
+
+NESTED = {
+    "data": {
+        "System": {
+            "@xmlns": "http://cisco.com/ns/yang/cisco-nx-os-device",
+            "intf-items": {
+                "phys-items": {
+                    "PhysIf-list": [
+                        {"id": "eth1/1", "descr": "uplink", "mtu": 9216},
+                        {"id": "eth1/2", "descr": None, "vlans": []},
+                    ]
+                }
+            },
+            "empty": {},
+        }
+    }
+}
+
+DOTTED = {
+    "data.System.@xmlns": "http://cisco.com/ns/yang/cisco-nx-os-device",
+    "data.System.intf-items.phys-items.PhysIf-list[0].id": "eth1/1",
+    "data.System.intf-items.phys-items.PhysIf-list[0].descr": "uplink",
+    "data.System.intf-items.phys-items.PhysIf-list[0].mtu": 9216,
+    "data.System.intf-items.phys-items.PhysIf-list[1].id": "eth1/2",
+    "data.System.intf-items.phys-items.PhysIf-list[1].descr": None,
+}
+
+
+class TestDotUtils(unittest.TestCase):
+    def test_to_dotted(self):
+        """Check a nested structure is flattened"""
+        result = to_dotted(NESTED)
+        self.assertEqual(result, DOTTED)
+        self.assertEqual(list(result), list(DOTTED))
+
+    def test_to_dotted_list_root(self):
+        """Check a list at the root is indexed without a name"""
+        result = to_dotted([{"a": 1}, [2, 3]])
+        self.assertEqual(result, {"[0].a": 1, "[1][0]": 2, "[1][1]": 3})
+
+    def test_to_dotted_scalar(self):
+        """Check a scalar is returned with an empty path"""
+        self.assertEqual(to_dotted("abc"), {"": "abc"})
+
+    def test_to_dotted_non_string_keys(self):
+        """Check non string keys are formatted below the root"""
+        result = to_dotted({"a": {5: {5.5: "x"}}, 1: "y"})
+        self.assertEqual(result, {"a.5.5.5": "x", 1: "y"})
+
+    def test_to_dotted_deep(self):
+        """Check trees deeper than the recursion limit are flattened"""
+        depth = sys.getrecursionlimit() + 100
+        nested = "leaf"
+        for _idx in range(depth):
+            nested = {"a": nested}
+        result = to_dotted(nested)
+        self.assertEqual(result, {".".join(["a"] * depth): "leaf"})
+
+    def test_iter_dotted(self):
+        """Check pairs are yielded lazily in source order"""
+        result = iter_dotted(NESTED)
+        self.assertEqual(next(result), list(DOTTED.items())[0])
+        self.assertEqual(list(result), list(DOTTED.items())[1:])
+
+    def test_from_dotted(self):
+        """Check a flat dict is rebuilt, sizing lists from the indices"""
+        result = from_dotted(DOTTED)
+        expected = {
+            "data": {
+                "System": {
+                    "@xmlns": "http://cisco.com/ns/yang/cisco-nx-os-device",
+                    "intf-items": {
+                        "phys-items": {
+                            "PhysIf-list": [
+                                {
+                                    "id": "eth1/1",
+                                    "descr": "uplink",
+                                    "mtu": 9216,
+                                },
+                                {"id": "eth1/2", "descr": None},
+                            ]
+                        }
+                    },
+                }
+            }
+        }
+        self.assertEqual(result, expected)
+
+    def test_from_dotted_round_trip(self):
+        """Check lists at the root and nested lists round trip"""
+        for nested in ([{"a": 1}, [2, [3]]], {"a": [[1, 2], {"b": "c"}]}):
+            self.assertEqual(from_dotted(to_dotted(nested)), nested)
+        self.assertEqual(from_dotted(to_dotted("abc")), "abc")
+
+    def test_from_dotted_sparse(self):
+        """Check missing list entries are filled with None"""
+        result = from_dotted({"a[2]": "c", "a[0]": "a"})
+        self.assertEqual(result, {"a": ["a", None, "c"]})
+
+    def test_from_dotted_conflict(self):
+        """Check a path used as both a value and a container"""
+        for dotted in ({"a": 1, "a.b": 2}, {"a.b": 2, "a": 1}):
+            with self.assertRaises(ValueError) as error:
+                from_dotted(dotted)
+            self.assertIn("both a value and a container", str(error.exception))
+        with self.assertRaises(ValueError) as error:
+            from_dotted({"a[0]": 1, "a.b": 2})
+        self.assertIn("both a list and a dictionary", str(error.exception))
+
+    def test_from_dotted_bad_index(self):
+        """Check indexes that are not non-negative integers"""
+        for path in ("a[-1]", "a[x]", "a[]", "a[1].b[2x].c", "a[1"):
+            with self.assertRaises(ValueError) as error:
+                from_dotted({path: 1})
+            self.assertIn("Malformed index in path", str(error.exception))
+
+    def test_dotted_index_select(self):
+        """Check a subtree is selected in the original order"""
+        dotted = to_dotted({"a": [{"b": i} for i in range(12)], "ab": 1})
+        index = DottedIndex(dotted)
+        self.assertEqual(index.select("a[1]"), {"a[1].b": 1})
+        self.assertEqual(index.select("a[1].b"), {"a[1].b": 1})
+        self.assertEqual(
+            list(index.select("a")), ["a[{}].b".format(i) for i in range(12)]
+        )
+        self.assertEqual(index.select("ab"), {"ab": 1})
+        self.assertEqual(index.select("a[2"), {})
+        self.assertEqual(index.select(""), dotted)
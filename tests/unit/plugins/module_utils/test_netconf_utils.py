@@ -0,0 +1,630 @@
+# (c) 2020 Ansible Project
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import gzip
+import os
+import shutil
+import tempfile
+
+from ansible.errors import AnsibleModuleError
+from ansible.module_utils._text import to_text
+from ansible_collections.ansible.netcommon.tests.unit.compat import unittest
+from ansible_collections.ansible.netcommon.tests.unit.compat.mock import (
+    patch,
+)
+from ansible_collections.cidrblock.dev.plugins.module_utils import (
+    netconf_utils,
+)
+from ansible_collections.cidrblock.dev.plugins.module_utils.netconf_utils import (
+    cached_capabilities,
+    config_edit,
+    content_scope,
+    filter_type_of,
+    load_snapshot,
+    merge_reply,
+    page_filters,
+    plan_filters,
+    replies_sha256,
+    save_snapshot,
+    scope_reply,
+    simulate_edit,
+    snapshot_path,
+    split_reply,
+    Timings,
+    write_reply,
+)
+from ansible_collections.cidrblock.dev.plugins.module_utils.xml_utils import (
+    ensure_xml_or_str,
+    fromstring,
+    tostring,
+    xml_equal,
+)
+
+INTF = '<interfaces xmlns="urn:ietf:params:xml:ns:yang:ietf-interfaces"/>'
+VLAN = '<vlans xmlns="http://openconfig.net/yang/vlan"><vlan/></vlans>'
+SYSTEM = "<system><hostname/></system>"
+
+REPLY = """<data xmlns="urn:ietf:params:xml:ns:netconf:base:1.0">
+<interfaces xmlns="urn:ietf:params:xml:ns:yang:ietf-interfaces"><a/></interfaces>
+<vlans xmlns="http://openconfig.net/yang/vlan"><vlan/></vlans>
+<system xmlns="urn:system"><hostname>r1</hostname></system>
+</data>"""
+
+
+CAPABILITIES = {"device_operations": {"supports_commit": True}}
+
+
+class Module(object):
+    def __init__(self, socket_path=None, check_mode=False):
+        self._socket_path = socket_path
+        self.check_mode = check_mode
+
+    def atomic_move(self, src, dest):
+        os.rename(src, dest)
+
+
+def named(*filters):
+    result = []
+    for name, value in filters:
+        filter, tipe, root = ensure_xml_or_str(value, "filter")
+        result.append((name, filter_type_of(tipe), filter, root))
+    return result
+
+
+class TestNetconfUtils(unittest.TestCase):
+    def test_plan_filters_single(self):
+        """Check a single filter is sent unchanged"""
+        self.assertEqual(
+            plan_filters(named((None, INTF))),
+            [(("subtree", INTF), [(None, None)])],
+        )
+        self.assertEqual(
+            plan_filters(named((None, None))), [(None, [(None, None)])]
+        )
+
+    def test_plan_filters_merged(self):
+        """Check subtree filters with different roots share an RPC"""
+        rpcs = plan_filters(
+            named(
+                ("intf", INTF),
+                ("xpath", "/system"),
+                ("vlan", VLAN),
+                ("again", "<interfaces><b/></interfaces>"),
+            )
+        )
+        self.assertEqual(len(rpcs), 3)
+        spec, keys = rpcs[0]
+        merged = fromstring(spec)
+        self.assertEqual(merged.tag, "filter")
+        self.assertEqual(merged.get("type"), "subtree")
+        self.assertEqual(
+            [elem.tag for elem in merged],
+            [
+                "{urn:ietf:params:xml:ns:yang:ietf-interfaces}interfaces",
+                "{http://openconfig.net/yang/vlan}vlans",
+            ],
+        )
+        self.assertEqual([name for name, _root in keys], ["intf", "vlan"])
+        self.assertEqual(rpcs[1], (("xpath", "/system"), [("xpath", None)]))
+        self.assertEqual(
+            rpcs[2],
+            (("subtree", "<interfaces><b/></interfaces>"), [("again", None)]),
+        )
+
+    def test_split_reply(self):
+        """Check a merged reply is split by the root of each filter"""
+        _spec, keys = plan_filters(
+            named(("intf", INTF), ("vlan", VLAN), ("system", SYSTEM))
+        )[0]
+        replies = split_reply(fromstring(REPLY), keys)
+        self.assertEqual(sorted(replies), ["intf", "system", "vlan"])
+        for name, local in (
+            ("intf", "interfaces"),
+            ("vlan", "vlans"),
+            ("system", "system"),
+        ):
+            reply = replies[name]
+            self.assertEqual(
+                reply.tag, "{urn:ietf:params:xml:ns:netconf:base:1.0}data"
+            )
+            self.assertEqual(
+                [elem.tag.rpartition("}")[2] for elem in reply], [local]
+            )
+        self.assertIn(b"<hostname>r1</hostname>", tostring(replies["system"]))
+
+    def test_split_reply_rpc_reply(self):
+        """Check the data element is found within an rpc-reply"""
+        _spec, keys = plan_filters(named(("intf", INTF), ("vlan", VLAN)))[0]
+        reply = fromstring("<rpc-reply>{}</rpc-reply>".format(REPLY))
+        replies = split_reply(reply, keys)
+        self.assertEqual(len(replies["vlan"]), 1)
+
+    def test_page_filters(self):
+        """Check a filter is split by its top-level containers"""
+        root = fromstring(
+            '<System xmlns="urn:nx"><intf-items/>\n<bgp-items><a/></bgp-items>'
+            "</System>"
+        )
+        self.assertEqual(
+            page_filters(root),
+            [
+                '<System xmlns="urn:nx"><intf-items/></System>',
+                '<System xmlns="urn:nx"><bgp-items><a/></bgp-items></System>',
+            ],
+        )
+        self.assertEqual(page_filters(fromstring(INTF)), [INTF])
+
+    def test_plan_filters_paging(self):
+        """Check paging sends each page on its own and merges nothing"""
+        rpcs = plan_filters(
+            named(("sys", "<system><a/><b/></system>"), ("intf", INTF)),
+            paging=True,
+        )
+        self.assertEqual(
+            rpcs,
+            [
+                (("subtree", "<system><a/></system>"), [("sys", None)]),
+                (("subtree", "<system><b/></system>"), [("sys", None)]),
+                (("subtree", INTF), [("intf", None)]),
+            ],
+        )
+
+    def test_merge_reply(self):
+        """Check the replies to pages are put back together"""
+        data = (
+            '<data xmlns="urn:ietf:params:xml:ns:netconf:base:1.0">{}</data>'
+        )
+        response = fromstring(
+            data.format('<system xmlns="urn:system"><a>1</a></system>')
+        )
+        for page in (
+            '<system xmlns="urn:system"><b>2</b></system>',
+            "",
+            VLAN,
+        ):
+            merge_reply(response, fromstring(data.format(page)))
+        self.assertEqual(
+            tostring(response),
+            tostring(
+                fromstring(
+                    data.format(
+                        '<system xmlns="urn:system"><a>1</a><b>2</b></system>'
+                        + VLAN
+                    )
+                )
+            ),
+        )
+
+    def test_cached_capabilities(self):
+        """Check capabilities are fetched once per connection"""
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        socket_path = os.path.join(tmpdir, "socket")
+        open(socket_path, "w").close()
+
+        def fetch(module):
+            module._netconf_capabilities = dict(CAPABILITIES)
+            return module._netconf_capabilities
+
+        with patch.object(
+            netconf_utils, "get_capabilities", side_effect=fetch
+        ) as get_capabilities:
+            module = Module(socket_path)
+            self.assertEqual(cached_capabilities(module), CAPABILITIES)
+            self.assertEqual(cached_capabilities(module), CAPABILITIES)
+            self.assertEqual(get_capabilities.call_count, 1)
+
+            module = Module(socket_path)
+            self.assertEqual(cached_capabilities(module), CAPABILITIES)
+            self.assertEqual(module._netconf_capabilities, CAPABILITIES)
+            self.assertEqual(get_capabilities.call_count, 1)
+
+            cached_capabilities(Module(socket_path), refresh=True)
+            self.assertEqual(get_capabilities.call_count, 2)
+
+            # a new connection replaces the socket
+            replacement = os.path.join(tmpdir, "new")
+            open(replacement, "w").close()
+            os.rename(replacement, socket_path)
+            cached_capabilities(Module(socket_path))
+            self.assertEqual(get_capabilities.call_count, 3)
+
+    def test_cached_capabilities_stale(self):
+        """Check files left by closed connections are removed"""
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        socket_path = os.path.join(tmpdir, "socket")
+        open(socket_path, "w").close()
+        other = os.path.join(tmpdir, "other")
+        open(other, "w").close()
+        for path in ("gone", "other"):
+            with open(os.path.join(tmpdir, path + ".capabilities"), "w"):
+                pass
+
+        with patch.object(
+            netconf_utils, "get_capabilities", return_value=CAPABILITIES
+        ):
+            cached_capabilities(Module(socket_path))
+        self.assertEqual(
+            sorted(os.listdir(tmpdir)),
+            ["other", "other.capabilities", "socket", "socket.capabilities"],
+        )
+
+    def test_write_reply(self):
+        """Check a reply is written and only replaced when it changes"""
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        reply = fromstring(REPLY)
+        for compress in (False, True):
+            dest = os.path.join(tmpdir, "reply{}".format(int(compress)))
+            result = write_reply(Module(), reply, dest, compress)
+            self.assertTrue(result["changed"])
+            self.assertEqual(result["elements"], 7)
+            self.assertEqual(result["size"], os.path.getsize(dest))
+            opener = gzip.open if compress else open
+            with opener(dest, "rb") as fhand:
+                written = fhand.read()
+            self.assertTrue(written.startswith(b"<?xml"))
+            self.assertEqual(fromstring(written).tag, reply.tag)
+            again = write_reply(Module(), reply, dest, compress)
+            self.assertFalse(again["changed"])
+            self.assertEqual(again["sha256"], result["sha256"])
+        self.assertEqual(sorted(os.listdir(tmpdir)), ["reply0", "reply1"])
+
+    def test_write_reply_check_mode(self):
+        """Check nothing is written in check mode"""
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        dest = os.path.join(tmpdir, "reply")
+        result = write_reply(Module(check_mode=True), fromstring(REPLY), dest)
+        self.assertTrue(result["changed"])
+        self.assertEqual(os.listdir(tmpdir), [])
+
+    def test_replies_sha256(self):
+        """Check the digest only changes with the replies"""
+        digest = replies_sha256([fromstring(REPLY)])
+        self.assertEqual(digest, replies_sha256([fromstring(REPLY)]))
+        changed = REPLY.replace("r1", "r2")
+        self.assertNotEqual(digest, replies_sha256([fromstring(changed)]))
+        self.assertNotEqual(
+            replies_sha256([fromstring(INTF), fromstring(VLAN)]),
+            replies_sha256([fromstring(VLAN), fromstring(INTF)]),
+        )
+
+    def test_snapshot(self):
+        """Check a snapshot is saved and read back"""
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        directory = os.path.join(tmpdir, "r1")
+        path = snapshot_path(directory, ["running", INTF])
+        self.assertEqual(path, snapshot_path(directory, ["running", INTF]))
+        self.assertNotEqual(path, snapshot_path(directory, ["running", VLAN]))
+        self.assertIsNone(load_snapshot(path))
+        save_snapshot(path, "abc", {"output": {"a": "b"}})
+        self.assertEqual(
+            load_snapshot(path),
+            {"sha256": "abc", "result": {"output": {"a": "b"}}},
+        )
+        self.assertEqual(os.listdir(directory), [os.path.basename(path)])
+
+    def test_timings(self):
+        """Check phases add up and replies are counted"""
+        timings = Timings()
+        for _idx in range(2):
+            with timings.phase("rpc"):
+                pass
+        timings.count_reply(fromstring(REPLY))
+        timings.count_reply(REPLY)
+        result = timings.result()
+        self.assertEqual(sorted(result), ["bytes", "elements", "rpc"])
+        self.assertGreaterEqual(result["rpc"], 0)
+        self.assertEqual(result["elements"], 14)
+        self.assertGreater(result["bytes"], len(REPLY))
+
+    def test_timings_disabled(self):
+        """Check nothing is recorded when disabled"""
+        timings = Timings(enabled=False)
+        with timings.phase("rpc"):
+            pass
+        timings.count_reply(REPLY)
+        self.assertEqual(timings.result(), {"bytes": 0, "elements": 0})
+
+    def test_content_scope(self):
+        """Check the scope selects the top-level containers of the content"""
+        spec, roots = content_scope(
+            fromstring(
+                '<config><system xmlns="urn:system"><hostname>r2</hostname>'
+                '</system><vlans xmlns="http://openconfig.net/yang/vlan"/>'
+                "</config>"
+            )
+        )
+        self.assertEqual(
+            spec,
+            '<filter type="subtree"><system xmlns="urn:system"/>'
+            '<vlans xmlns="http://openconfig.net/yang/vlan"/></filter>',
+        )
+        replies = scope_reply(fromstring(REPLY), roots)
+        self.assertEqual(
+            [elem.tag for elem in replies],
+            ["{http://openconfig.net/yang/vlan}vlans", "{urn:system}system"],
+        )
+        self.assertEqual(content_scope(fromstring("<config/>")), (None, None))
+
+    def test_content_scope_several(self):
+        """Check the containers of several configs are selected once"""
+        spec, roots = content_scope(
+            fromstring("<config><a/><b/></config>"),
+            fromstring("<config><b><c/></b><d/></config>"),
+        )
+        self.assertEqual(spec, '<filter type="subtree"><a/><b/><d/></filter>')
+        self.assertEqual(len(roots), 3)
+
+    def test_scope_reply_served(self):
+        """Check a narrowed reply equals what the server sends for the scope"""
+        scoped = scope_reply(
+            fromstring(REPLY), [fromstring('<system xmlns="urn:system"/>')]
+        )
+        served = (
+            '<data xmlns="urn:ietf:params:xml:ns:netconf:base:1.0"'
+            ' xmlns:x="urn:x">\n  <system xmlns="urn:system">\n'
+            "    <hostname>r1</hostname>\n  </system>\n</data>"
+        )
+        self.assertTrue(xml_equal(scoped, served))
+        self.assertFalse(xml_equal(scoped, served.replace("r1", "r2")))
+
+    def test_config_edit(self):
+        """Check only the changes are sent, within their parents"""
+        current = fromstring(
+            '<data xmlns="urn:ietf:params:xml:ns:netconf:base:1.0">'
+            '<System xmlns="urn:nx"><intf-items><phys-items>'
+            "<PhysIf-list><id>eth1/1</id><descr>a</descr><mtu>1500</mtu>"
+            "</PhysIf-list>"
+            "<PhysIf-list><id>eth1/2</id><descr>b</descr></PhysIf-list>"
+            "</phys-items></intf-items><hostname>r1</hostname></System></data>"
+        )
+        desired = fromstring(
+            '<config><System xmlns="urn:nx"><intf-items><phys-items>'
+            "<PhysIf-list><id>eth1/2</id><descr>c</descr></PhysIf-list>"
+            "<PhysIf-list><id>eth1/3</id></PhysIf-list>"
+            "</phys-items></intf-items></System></config>"
+        )
+        self.assertEqual(
+            to_text(tostring(config_edit(current, desired))),
+            '<config xmlns:nc="urn:ietf:params:xml:ns:netconf:base:1.0">'
+            '<System xmlns="urn:nx"><intf-items><phys-items>'
+            "<PhysIf-list><id>eth1/2</id><descr>c</descr></PhysIf-list>"
+            "<PhysIf-list><id>eth1/3</id></PhysIf-list>"
+            "</phys-items></intf-items></System></config>",
+        )
+        pruned = to_text(tostring(config_edit(current, desired, None, True)))
+        self.assertIn(
+            '<PhysIf-list nc:operation="delete"><id>eth1/1</id></PhysIf-list>',
+            pruned,
+        )
+        self.assertNotIn("hostname", pruned)
+        pruned = to_text(
+            tostring(config_edit(current, desired, prune_nodes=True))
+        )
+        self.assertIn('<hostname nc:operation="delete"/>', pruned)
+        self.assertNotIn("eth1/1", pruned)
+        self.assertIsNone(config_edit(current, fromstring("<config/>")))
+
+    def test_config_edit_filtered(self):
+        """Check a desired state read with a filter deletes nothing the
+        filter left out
+        """
+        current = fromstring(
+            '<data xmlns="urn:ietf:params:xml:ns:netconf:base:1.0">'
+            '<System xmlns="urn:nx"><bd-items><bd>10</bd></bd-items>'
+            "<bgp-items><asn>65000</asn></bgp-items><intf-items>"
+            "<lo-items><LbRtdIf-list><id>lo0</id></LbRtdIf-list></lo-items>"
+            "<phys-items>"
+            "<PhysIf-list><id>eth1/9</id><descr>a</descr></PhysIf-list>"
+            "<PhysIf-list><id>eth1/10</id><descr>b</descr></PhysIf-list>"
+            "</phys-items></intf-items></System></data>"
+        )
+        desired = fromstring(
+            '<config><System xmlns="urn:nx"><intf-items><phys-items>'
+            "<PhysIf-list><id>eth1/10</id><descr>c</descr></PhysIf-list>"
+            "</phys-items></intf-items></System></config>"
+        )
+        self.assertEqual(
+            to_text(tostring(config_edit(current, desired))),
+            '<config xmlns:nc="urn:ietf:params:xml:ns:netconf:base:1.0">'
+            '<System xmlns="urn:nx"><intf-items><phys-items>'
+            "<PhysIf-list><id>eth1/10</id><descr>c</descr></PhysIf-list>"
+            "</phys-items></intf-items></System></config>",
+        )
+
+    def test_config_edit_unchanged(self):
+        """Check nothing is sent when the configuration matches"""
+        current = fromstring(
+            "<data><system><ntp><server><name>a</name><prefer>true</prefer>"
+            "</server><server><name>b</name></server></ntp>"
+            "<dns>1.1.1.1</dns><dns>8.8.8.8</dns></system></data>"
+        )
+        desired = fromstring(
+            "<config><system>\n  <ntp><server><name>b</name></server>"
+            "<server><name>a</name><prefer>true</prefer></server></ntp>"
+            "<dns>8.8.8.8</dns><dns>1.1.1.1</dns></system></config>"
+        )
+        self.assertIsNone(config_edit(current, desired))
+        desired[0][2].text = "9.9.9.9"
+        self.assertEqual(
+            to_text(tostring(config_edit(current, desired, prune_lists=True))),
+            '<config xmlns:nc="urn:ietf:params:xml:ns:netconf:base:1.0">'
+            "<system><dns>9.9.9.9</dns>"
+            '<dns nc:operation="delete">1.1.1.1</dns></system></config>',
+        )
+
+    def test_config_edit_list_keys(self):
+        """Check entries are matched by the keys given"""
+        current = fromstring(
+            "<data><acl><rule><seq>1</seq><name>x</name><act>permit</act>"
+            "</rule></acl></data>"
+        )
+        desired = fromstring(
+            "<config><acl><rule><seq>1</seq><name>y</name><act>deny</act>"
+            "</rule></acl></config>"
+        )
+        # the first leaf alone matches the entry and changes its name
+        self.assertIn(
+            "<rule><seq>1</seq><name>y</name><act>deny</act></rule>",
+            to_text(tostring(config_edit(current, desired))),
+        )
+        edit = config_edit(current, desired, {"rule": ["seq", "name"]})
+        self.assertEqual(
+            to_text(tostring(edit)),
+            '<config xmlns:nc="urn:ietf:params:xml:ns:netconf:base:1.0">'
+            "<acl><rule><seq>1</seq><name>y</name><act>deny</act></rule>"
+            "</acl></config>",
+        )
+
+    def test_config_edit_single_entry(self):
+        """Check a list named in list_keys is diffed as a list with a
+        single entry on each side"""
+        current = fromstring(
+            "<data><system><ntp><server><name>a</name><prefer>true</prefer>"
+            "<ver>4</ver></server></ntp></system></data>"
+        )
+        desired = fromstring(
+            "<config><system><ntp><server><name>b</name><ver>4</ver>"
+            "</server></ntp></system></config>"
+        )
+        keys = {"server": ["name"]}
+        self.assertEqual(
+            to_text(tostring(config_edit(current, desired, keys))),
+            '<config xmlns:nc="urn:ietf:params:xml:ns:netconf:base:1.0">'
+            "<system><ntp><server><name>b</name><ver>4</ver></server></ntp>"
+            "</system></config>",
+        )
+        self.assertIn(
+            '<server nc:operation="delete"><name>a</name></server>',
+            to_text(tostring(config_edit(current, desired, keys, True))),
+        )
+
+    def test_config_edit_many_entries(self):
+        """Check entries are matched by key, not by position"""
+        entries = "".join(
+            "<server><name>s%d</name><ver>4</ver></server>" % idx
+            for idx in range(2000)
+        )
+        current = fromstring(
+            "<data><system><ntp>%s</ntp></system></data>" % entries
+        )
+        desired = fromstring(
+            "<config><system><ntp>%s</ntp></system></config>"
+            % entries.replace(
+                "<name>s1999</name><ver>4", "<name>s1999</name><ver>3"
+            )
+        )
+        desired[0][0].insert(0, desired[0][0][-1])
+        self.assertEqual(
+            to_text(tostring(config_edit(current, desired))),
+            '<config xmlns:nc="urn:ietf:params:xml:ns:netconf:base:1.0">'
+            "<system><ntp><server><name>s1999</name><ver>3</ver></server>"
+            "</ntp></system></config>",
+        )
+
+    def test_simulate_edit(self):
+        """Check merge, replace, create, delete and remove are applied"""
+        current = fromstring(
+            "<data><system><hostname>r1</hostname><ntp><server><name>a"
+            "</name><prefer>true</prefer></server><server><name>b</name>"
+            "</server></ntp></system></data>"
+        )
+        config = fromstring(
+            '<config xmlns:nc="urn:ietf:params:xml:ns:netconf:base:1.0">'
+            "<system><hostname>r2</hostname><ntp>"
+            '<server nc:operation="replace"><name>a</name></server>'
+            '<server operation="remove"><name>b</name></server>'
+            '<server nc:operation="create"><name>c</name></server>'
+            "</ntp><domain>lab</domain></system></config>"
+        )
+        self.assertTrue(
+            xml_equal(
+                simulate_edit(current, config),
+                "<data><system><hostname>r2</hostname><ntp><server><name>a"
+                "</name></server><server><name>c</name></server></ntp>"
+                "<domain>lab</domain></system></data>",
+            )
+        )
+        # the current configuration is left alone
+        self.assertEqual(current[0][0].text, "r1")
+
+    def test_simulate_edit_single_entry(self):
+        """Check an entry merged or created in a list with one entry is
+        added to it"""
+        current = fromstring(
+            "<data><system><ntp><server><name>a</name><prefer>true</prefer>"
+            "</server></ntp></system></data>"
+        )
+        expected = (
+            "<data><system><ntp><server><name>a</name><prefer>true</prefer>"
+            "</server><server><name>b</name></server></ntp></system></data>"
+        )
+        keys = {"server": ["name"]}
+        for operation in ("", ' operation="create"'):
+            config = fromstring(
+                "<config><system><ntp><server%s><name>b</name></server>"
+                "</ntp></system></config>" % operation
+            )
+            simulated = simulate_edit(current, config, None, keys)
+            self.assertTrue(xml_equal(simulated, expected))
+        # the same entry merged again is changed, not added
+        config = fromstring(
+            "<config><system><ntp><server><name>a</name><prefer>false"
+            "</prefer></server></ntp></system></config>"
+        )
+        self.assertTrue(
+            xml_equal(
+                simulate_edit(current, config, None, keys),
+                expected.replace("true", "false").replace(
+                    "<server><name>b</name></server>", ""
+                ),
+            )
+        )
+
+    def test_simulate_edit_errors(self):
+        """Check edits the server would reject raise its error"""
+        current = fromstring(
+            "<data><system><hostname>r1</hostname></system></data>"
+        )
+        for config, error in (
+            (
+                '<config><system><domain operation="delete"/></system>'
+                "</config>",
+                "data-missing: /system/domain",
+            ),
+            (
+                '<config><system><hostname operation="create">r2</hostname>'
+                "</system></config>",
+                "data-exists: /system/hostname",
+            ),
+        ):
+            with self.assertRaises(AnsibleModuleError) as exc:
+                simulate_edit(current, fromstring(config))
+            self.assertIn(error, str(exc.exception))
+        with self.assertRaises(AnsibleModuleError):
+            simulate_edit(
+                current,
+                fromstring("<config><vlans><vlan/></vlans></config>"),
+                "none",
+            )
+        self.assertTrue(
+            xml_equal(
+                simulate_edit(
+                    current,
+                    fromstring(
+                        "<config><system><hostname>r2</hostname></system>"
+                        "</config>"
+                    ),
+                    "none",
+                ),
+                current,
+            )
+        )
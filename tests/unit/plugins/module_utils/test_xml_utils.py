@@ -0,0 +1,464 @@
+# (c) 2020 Ansible Project
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import io
+import os
+import shutil
+import sys
+import tempfile
+
+from ansible_collections.ansible.netcommon.plugins.module_utils.network.common.netconf import (
+    transform_reply,
+)
+from ansible_collections.ansible.netcommon.tests.unit.compat import unittest
+from ansible_collections.cidrblock.dev.plugins.module_utils.dot_utils import (
+    to_dotted,
+)
+from ansible_collections.cidrblock.dev.plugins.module_utils.xml_utils import (
+    HAS_LXML,
+    HAS_XMLTODICT,
+    _strip_namespace,
+    ensure_xml_or_str,
+    fromstring,
+    iter_xml,
+    iter_xml_dotted,
+    iter_xml_items,
+    parse_xml,
+    select_xml,
+    strip_tree_namespaces,
+    tostring,
+    write_xml,
+    xml_equal,
+    xml_to_native,
+)
+from ansible_collections.cidrblock.dev.plugins.module_utils import xml_utils
+
+try:
+    import xmltodict
+except ImportError:
+    pass
+
+REPLY = """<?xml version="1.0" encoding="UTF-8"?>
+<rpc-reply xmlns:nc="urn:ietf:params:xml:ns:netconf:base:1.0" message-id="101">
+  <nc:data>
+    <System xmlns="http://cisco.com/ns/yang/cisco-nx-os-device">
+      <intf-items>
+        <phys-items>
+          <PhysIf-list>
+            <id>eth1/1</id>
+            <descr>uplink</descr>
+            <!-- a comment -->
+          </PhysIf-list>
+          <PhysIf-list>
+            <id>eth1/2</id>
+            <descr nc:operation="merge">down<!-- split -->link</descr>
+            <mtu/>
+          </PhysIf-list>
+        </phys-items>
+        <lo-items/>
+      </intf-items>
+    </System>
+  </nc:data>
+</rpc-reply>
+"""
+
+PARITY = [
+    REPLY,
+    "<a/>",
+    "<a>text</a>",
+    "<a>  </a>",
+    '<a x="1"/>',
+    '<a x="1">text</a>',
+    "<a><b/><b/><c>1</c><b>2</b></a>",
+    "<a>head<b>1</b>tail</a>",
+    "<a><![CDATA[<not a tag>]]> &amp; &lt;</a>",
+    "<a><!-- comment --><?pi data?><b>1</b></a>",
+    '<a xmlns="urn:a" xmlns:b="urn:b"><b:c b:d="1">x</b:c><e/></a>',
+    '<?xml version="1.0" encoding="ISO-8859-1"?><a>\u00e9</a>',
+    "<a><b><c><d><e>deep</e></d></c></b></a>",
+    '<a><b xml:lang="en">error</b></a>',
+    '<a xmlns="urn:a"><b xmlns="urn:a">1</b><c xmlns="urn:a"><d/></c></a>',
+    '<a xmlns:p="urn:p"><b xmlns:p="urn:p" p:x="1"/><b xmlns:p="urn:q"/></a>',
+]
+
+LIST = "data.System.intf-items.phys-items.PhysIf-list"
+
+DOTTED = [
+    ("rpc-reply.@xmlns:nc", "urn:ietf:params:xml:ns:netconf:base:1.0"),
+    ("rpc-reply.@message-id", "101"),
+    (
+        "rpc-reply.nc:data.System.@xmlns",
+        "http://cisco.com/ns/yang/cisco-nx-os-device",
+    ),
+    ("rpc-reply.nc:" + LIST + "[0].id", "eth1/1"),
+    ("rpc-reply.nc:" + LIST + "[0].descr", "uplink"),
+    ("rpc-reply.nc:" + LIST + "[1].id", "eth1/2"),
+    ("rpc-reply.nc:" + LIST + "[1].descr.@nc:operation", "merge"),
+    ("rpc-reply.nc:" + LIST + "[1].descr.#text", "downlink"),
+    ("rpc-reply.nc:" + LIST + "[1].mtu", None),
+    ("rpc-reply.nc:data.System.intf-items.lo-items", None),
+]
+
+
+NATIVE = {
+    "config": {
+        "@xmlns": "urn:a",
+        "vlan": [{"@op": 'a"b', "id": 1, "name": "a&b"}, {"id": 2}],
+        "enabled": True,
+        "empty": None,
+        "skipped": [],
+        "descr": {"#text": "mixed", "line": ["1", "2"]},
+    }
+}
+
+
+class TestXmlUtils(unittest.TestCase):
+    def test_iter_xml_dotted(self):
+        """Check an XML document is flattened to dotted paths"""
+        self.assertEqual(list(iter_xml_dotted(REPLY)), DOTTED)
+
+    @unittest.skipUnless(HAS_LXML, "lxml is not installed")
+    def test_iter_xml_dotted_element(self):
+        """Check an already parsed reply is flattened"""
+        element = fromstring(REPLY.encode("utf-8"))
+        self.assertEqual(list(iter_xml_dotted(element)), DOTTED)
+
+    @unittest.skipUnless(HAS_XMLTODICT, "xmltodict is not installed")
+    def test_iter_xml_dotted_native(self):
+        """Check the result matches the native conversion"""
+        native = xml_to_native(REPLY, "display")
+        self.assertEqual(
+            list(iter_xml_dotted(REPLY)), list(to_dotted(native).items())
+        )
+
+    def test_iter_xml_dotted_scalar(self):
+        """Check a document with a single element"""
+        self.assertEqual(list(iter_xml_dotted("<a>1</a>")), [("a", "1")])
+        self.assertEqual(list(iter_xml_dotted("<a/>")), [("a", None)])
+
+    def test_iter_xml_items(self):
+        """Check the elements at a depth are streamed one at a time"""
+        result = list(iter_xml_items(REPLY, 6))
+        self.assertEqual(
+            result,
+            [
+                {"PhysIf-list": {"id": "eth1/1", "descr": "uplink"}},
+                {
+                    "PhysIf-list": {
+                        "id": "eth1/2",
+                        "descr": {
+                            "@nc:operation": "merge",
+                            "#text": "downlink",
+                        },
+                        "mtu": None,
+                    }
+                },
+            ],
+        )
+
+    @unittest.skipUnless(HAS_XMLTODICT, "xmltodict is not installed")
+    def test_iter_xml_items_native(self):
+        """Check each depth matches the native conversion"""
+        native = xml_to_native(REPLY, "display")
+        self.assertEqual(list(iter_xml_items(REPLY, 1)), [native])
+        system = native["rpc-reply"]["nc:data"]["System"]
+        self.assertEqual(
+            list(iter_xml_items(REPLY, 4)),
+            [{"intf-items": system["intf-items"]}],
+        )
+
+    def test_parse_xml_strip_namespaces(self):
+        """Check prefixes and declarations are dropped while parsing"""
+        result = parse_xml(REPLY, strip_namespaces=True)
+        self.assertEqual(
+            result["rpc-reply"]["data"]["System"]["intf-items"]["phys-items"][
+                "PhysIf-list"
+            ][1]["descr"],
+            {"@operation": "merge", "#text": "downlink"},
+        )
+        self.assertEqual(
+            list(iter_xml_dotted(REPLY, strip_namespaces=True)),
+            [
+                (path.replace("nc:", ""), value)
+                for path, value in DOTTED
+                if "@xmlns" not in path
+            ],
+        )
+        self.assertEqual(
+            list(iter_xml_items(REPLY, 3, strip_namespaces=True)),
+            [{"System": result["rpc-reply"]["data"]["System"]}],
+        )
+
+    @unittest.skipUnless(
+        HAS_LXML and HAS_XMLTODICT, "lxml and xmltodict are required"
+    )
+    def test_parse_xml_parity(self):
+        """Check the lxml conversion matches xmltodict"""
+        for doc in PARITY:
+            for data in (doc, doc.encode("utf-8")):
+                expected = xmltodict.parse(data, dict_constructor=dict)
+                self.assertEqual(parse_xml(data), expected, doc)
+
+    @unittest.skipUnless(
+        HAS_LXML and HAS_XMLTODICT, "lxml and xmltodict are required"
+    )
+    def test_parse_xml_strip_namespaces_parity(self):
+        """Check stripping with lxml matches the xmltodict postprocessor"""
+        for doc in PARITY:
+            expected = xmltodict.parse(
+                doc, dict_constructor=dict, postprocessor=_strip_namespace
+            )
+            self.assertEqual(
+                parse_xml(doc, strip_namespaces=True), expected, doc
+            )
+
+    @unittest.skipUnless(HAS_LXML, "lxml is not installed")
+    def test_parse_xml_deep(self):
+        """Check a tree deeper than the recursion limit is converted"""
+        root = elem = fromstring("<a/>")
+        for _idx in range(sys.getrecursionlimit() + 10):
+            elem.append(elem.makeelement("a", {}))
+            elem = elem[0]
+        elem.text = "leaf"
+        result = parse_xml(root)
+        depth = 0
+        while isinstance(result, dict):
+            result = result["a"]
+            depth += 1
+        self.assertEqual(
+            (depth, result), (sys.getrecursionlimit() + 11, "leaf")
+        )
+
+    @unittest.skipUnless(
+        HAS_LXML and HAS_XMLTODICT, "lxml and xmltodict are required"
+    )
+    def test_parse_xml_entities(self):
+        """Check an entity reference raises rather than being dropped"""
+        doc = '<!DOCTYPE a [<!ENTITY e "v">]><a>&e;</a>'
+        with self.assertRaises(ValueError):
+            xmltodict.parse(doc)
+        with self.assertRaisesRegex(ValueError, "entities are disabled"):
+            parse_xml(doc)
+        with self.assertRaisesRegex(ValueError, "entities are disabled"):
+            list(iter_xml_dotted(doc))
+        with self.assertRaisesRegex(ValueError, "entities are disabled"):
+            list(iter_xml_items(doc, 1))
+
+    @unittest.skipUnless(HAS_XMLTODICT, "xmltodict is not installed")
+    def test_redeclared_namespace(self):
+        """Check a namespace declared again is reported in every form"""
+        doc = PARITY[-2]
+        native = xmltodict.parse(doc, dict_constructor=dict)
+        self.assertEqual(native["a"]["b"]["@xmlns"], "urn:a")
+        self.assertEqual(
+            dict(iter_xml_dotted(doc)), dict(to_dotted(native).items())
+        )
+        self.assertEqual(
+            list(iter_xml_items(doc, 2)),
+            [{"b": native["a"]["b"]}, {"c": native["a"]["c"]}],
+        )
+
+    def test_iter_xml(self):
+        """Check native data is serialized a fragment at a time"""
+        self.assertEqual(
+            "".join(iter_xml(NATIVE)),
+            '<config xmlns="urn:a"><vlan op=\'a"b\'><id>1</id>'
+            "<name>a&amp;b</name></vlan><vlan><id>2</id></vlan>"
+            "<enabled>true</enabled><empty></empty>"
+            "<descr><line>1</line><line>2</line>mixed</descr></config>",
+        )
+        with self.assertRaises(ValueError):
+            list(iter_xml({"a": "1", "b": "2"}, full_doc=True))
+
+    @unittest.skipUnless(HAS_XMLTODICT, "xmltodict is not installed")
+    def test_iter_xml_parity(self):
+        """Check the output matches xmltodict.unparse"""
+        for doc in [xmltodict.parse(doc) for doc in PARITY] + [NATIVE]:
+            for full_doc in (False, True):
+                for pretty in (False, True):
+                    self.assertEqual(
+                        "".join(
+                            iter_xml(doc, full_doc=full_doc, pretty=pretty)
+                        ),
+                        xmltodict.unparse(
+                            doc, full_document=full_doc, pretty=pretty
+                        ),
+                    )
+
+    def test_iter_xml_parity_errors(self):
+        """Check the documents xmltodict.unparse rejects raise ValueError"""
+        docs = [
+            {"a><script": 1},
+            {"a b": 1},
+            {"a": {"b/": 1}},
+            {"?a": 1},
+            {"a": {"@x y": 1}},
+            {"a": {"@x": 1, '@y"': 2}},
+            {"a": {"@xmlns": {"p=q": "urn:p"}}},
+        ]
+        for doc in docs:
+            for full_doc in (False, True):
+                with self.assertRaises(ValueError) as expected:
+                    xmltodict.unparse(doc, full_document=full_doc)
+                with self.assertRaises(ValueError) as error:
+                    "".join(iter_xml(doc, full_doc=full_doc))
+                self.assertEqual(str(error.exception), str(expected.exception))
+        for doc in ({"s": False, "t": []}, {"r": [1, 2]}, {"#comment": "c"}):
+            with self.assertRaises(ValueError) as expected:
+                xmltodict.unparse(doc)
+            with self.assertRaises(ValueError) as error:
+                "".join(iter_xml(doc, full_doc=True))
+            self.assertEqual(str(error.exception), str(expected.exception))
+        self.assertEqual(
+            "".join(iter_xml({"r": []}, full_doc=True)),
+            xmltodict.unparse({"r": []}),
+        )
+
+    @unittest.skipUnless(HAS_LXML, "lxml is not installed")
+    def test_strip_tree_namespaces(self):
+        """Check the tree serializes as the remove_namespaces XSLT gives it"""
+        from lxml.etree import XMLParser, XSLT
+
+        parser = XMLParser(remove_blank_text=True)
+        xslt = XSLT(fromstring(transform_reply(), parser))
+        docs = PARITY + [
+            '<a xmlns="urn:a" xmlns:p="urn:p" p:x="1" y="2" xml:lang="en">\n'
+            " <p:b> t </p:b><!-- c --> <c/>tail<d>  </d></a>"
+        ]
+        for doc in docs:
+            doc = doc.encode("utf-8")
+            expected = xslt(fromstring(doc, parser)).getroot()
+            self.assertEqual(
+                tostring(strip_tree_namespaces(fromstring(doc))),
+                tostring(expected),
+            )
+
+    def test_write_xml(self):
+        """Check fragments are gathered into chunks as they are written"""
+
+        class Dest(io.StringIO):
+            def __init__(self):
+                super(Dest, self).__init__()
+                self.writes = 0
+
+            def write(self, data):
+                self.writes += 1
+                return super(Dest, self).write(data)
+
+        data = {"a": {"b": [str(idx) for idx in range(100)]}}
+        expected = "".join(iter_xml(data))
+        original = xml_utils.CHUNK_SIZE
+        xml_utils.CHUNK_SIZE = 100
+        try:
+            dest = Dest()
+            self.assertEqual(write_xml(data, dest), len(expected))
+        finally:
+            xml_utils.CHUNK_SIZE = original
+        self.assertEqual(dest.getvalue(), expected)
+        self.assertEqual(dest.writes, len(expected) // 100 + 1)
+
+    @unittest.skipUnless(HAS_LXML, "lxml is not installed")
+    def test_select_xml(self):
+        """Check matched elements convert as in the whole document"""
+        native = parse_xml(REPLY)
+        physif = native["rpc-reply"]["nc:data"]["System"]["intf-items"][
+            "phys-items"
+        ]["PhysIf-list"]
+        namespaces = {"nx": "http://cisco.com/ns/yang/cisco-nx-os-device"}
+        self.assertEqual(
+            select_xml(REPLY, "//nx:PhysIf-list", namespaces),
+            [{"PhysIf-list": physif[0]}, {"PhysIf-list": physif[1]}],
+        )
+        self.assertEqual(
+            select_xml(REPLY, "//*[local-name()='descr']/@*"),
+            ["merge"],
+        )
+        self.assertEqual(
+            select_xml(REPLY, "//comment()"), [" a comment ", " split "]
+        )
+
+    def test_path(self):
+        """Check a file is parsed from disk in place of a document"""
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, "reply.xml")
+        with open(path, "w") as fhand:
+            fhand.write(REPLY)
+        self.assertEqual(parse_xml(path), parse_xml(REPLY))
+        self.assertEqual(list(iter_xml_dotted(path)), DOTTED)
+        self.assertEqual(
+            list(iter_xml_items(path, 6)), list(iter_xml_items(REPLY, 6))
+        )
+        original = xml_utils.CHUNK_SIZE
+        xml_utils.CHUNK_SIZE = 64
+        try:
+            self.assertEqual(
+                list(iter_xml_items(path, 3, strip_namespaces=True)),
+                list(iter_xml_items(REPLY, 3, strip_namespaces=True)),
+            )
+        finally:
+            xml_utils.CHUNK_SIZE = original
+
+    def test_ensure_xml_or_str_dict(self):
+        """Check dict content is serialized without xmltodict"""
+        result, tipe, root = ensure_xml_or_str({"a": {"b": "1"}}, "content")
+        self.assertEqual((result, tipe), ("<a><b>1</b></a>", "xml"))
+        self.assertEqual(root.tag, "a")
+
+    def test_ensure_xml_or_str(self):
+        """Check a string is parsed once and its root element returned"""
+        result, tipe, root = ensure_xml_or_str(REPLY, "content")
+        self.assertEqual((result, tipe), (REPLY, "xml"))
+        self.assertEqual(root.tag, "rpc-reply")
+        self.assertEqual(root[0][0][0][0][0][0].text, "eth1/1")
+        self.assertEqual(
+            ensure_xml_or_str("/netconf-state/schemas", "filter"),
+            ("/netconf-state/schemas", "str", None),
+        )
+        self.assertEqual(
+            ensure_xml_or_str("<a><b></a>", "filter"),
+            ("<a><b></a>", "str", None),
+        )
+        self.assertEqual(ensure_xml_or_str(None, "filter"), (None, None, None))
+
+    def test_xml_equal(self):
+        """Check layout, prefixes and attributes do not count as changes"""
+        left = (
+            '<data xmlns="urn:nc"><system xmlns="urn:s"><hostname>r1'
+            "</hostname><domain>lab</domain></system></data>"
+        )
+        right = (
+            '<nc:data xmlns:nc="urn:nc">\n  <s:system xmlns:s="urn:s">\n'
+            '    <s:hostname nc:operation="merge">r1</s:hostname>\n'
+            "    <s:domain>lab</s:domain>\n  </s:system>\n</nc:data>"
+        )
+        self.assertTrue(xml_equal(left, right))
+        self.assertTrue(xml_equal(fromstring(left), right, unordered=True))
+        self.assertFalse(xml_equal(left, right, attributes=True))
+        self.assertFalse(xml_equal(left, right.replace("r1", "r2")))
+        self.assertFalse(xml_equal(left, right.replace("lab", " lab")))
+        self.assertFalse(
+            xml_equal(left, right.replace("<s:domain>lab</s:domain>", ""))
+        )
+
+    def test_xml_equal_unordered(self):
+        """Check sibling order only counts when ordered"""
+        left = "<a><b><k>1</k></b><b><k>2</k></b><c/></a>"
+        right = "<a><c/><b><k>2</k></b><b><k>1</k></b></a>"
+        self.assertFalse(xml_equal(left, right))
+        self.assertTrue(xml_equal(left, right, unordered=True))
+        self.assertFalse(
+            xml_equal(left, right.replace("2", "3"), unordered=True)
+        )
+        # the same children split differently between parents
+        self.assertFalse(
+            xml_equal(
+                "<a><b><k/><k/></b><b/></a>",
+                "<a><b><k/></b><b><k/></b></a>",
+                unordered=True,
+            )
+        )
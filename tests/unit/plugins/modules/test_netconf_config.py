@@ -0,0 +1,305 @@
+# (c) 2020 Ansible Project
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+from ansible.module_utils.connection import ConnectionError
+from ansible_collections.ansible.netcommon.tests.unit.compat.mock import (
+    patch,
+)
+from ansible_collections.ansible.netcommon.tests.unit.modules.utils import (
+    AnsibleExitJson,
+    AnsibleFailJson,
+    ModuleTestCase,
+    set_module_args,
+)
+from ansible_collections.cidrblock.dev.plugins.modules import netconf_config
+from ansible_collections.cidrblock.dev.plugins.module_utils.xml_utils import (
+    fromstring,
+)
+
+CONTENTS = [
+    "<config><system><hostname>r2</hostname></system></config>",
+    "<config><vlans><vlan><id>10</id></vlan></vlans></config>",
+    "<config><system><domain>lab</domain></system></config>",
+]
+
+REPLY = """<data xmlns="urn:ietf:params:xml:ns:netconf:base:1.0">
+<system><hostname>r1</hostname></system></data>"""
+
+FULL_REPLY = """<data xmlns="urn:ietf:params:xml:ns:netconf:base:1.0">
+<system><hostname>r1</hostname></system>
+<vlans><vlan><id>10</id></vlan></vlans></data>"""
+
+SYSTEM_FILTER = '<filter type="subtree"><system/></filter>'
+
+NXOS_REPLY = """<data xmlns="urn:ietf:params:xml:ns:netconf:base:1.0">
+<System xmlns="http://cisco.com/ns/yang/cisco-nx-os-device">
+<bd-items><bd-items><BD-list><fabEncap>vlan-10</fabEncap></BD-list>
+</bd-items></bd-items>
+<bgp-items><inst-items><asn>65000</asn></inst-items></bgp-items>
+<intf-items>
+<lo-items><LbRtdIf-list><id>lo0</id></LbRtdIf-list></lo-items>
+<phys-items>
+<PhysIf-list><id>eth1/9</id><descr>uplink</descr></PhysIf-list>
+<PhysIf-list><id>eth1/10</id><descr>17</descr><mtu>1500</mtu></PhysIf-list>
+</phys-items>
+</intf-items>
+</System></data>"""
+
+
+def capabilities(candidate=True):
+    return {
+        "device_operations": {
+            "supports_commit": candidate,
+            "supports_writable_running": True,
+            "lock_datastore": ["candidate", "running"],
+        },
+        "server_capabilities": [],
+    }
+
+
+class TestNetconfConfig(ModuleTestCase):
+    def setUp(self):
+        super(TestNetconfConfig, self).setUp()
+        mock_connection = patch.object(netconf_config, "Connection")
+        self.conn = mock_connection.start().return_value
+        self.addCleanup(mock_connection.stop)
+        mock_capabilities = patch.object(netconf_config, "cached_capabilities")
+        self.capabilities = mock_capabilities.start()
+        self.capabilities.return_value = capabilities()
+        self.addCleanup(mock_capabilities.stop)
+        self.conn.get_config.return_value = REPLY
+
+    def run_module(self, args, failed=False):
+        set_module_args(args)
+        expected = AnsibleFailJson if failed else AnsibleExitJson
+        with self.assertRaises(expected) as exc:
+            netconf_config.main()
+        return exc.exception.args[0]
+
+    def test_contents_applied(self):
+        """Check each entry is applied and committed once"""
+        result = self.run_module({"contents": CONTENTS})
+        self.assertEqual(
+            result["contents"],
+            [
+                {"index": 0, "status": "applied"},
+                {"index": 1, "status": "applied"},
+                {"index": 2, "status": "applied"},
+            ],
+        )
+        self.assertEqual(self.conn.edit_config.call_count, 3)
+        self.conn.commit.assert_called_once()
+        self.conn.lock.assert_called_once_with(target="candidate")
+        self.conn.unlock.assert_called_once_with(target="candidate")
+
+    def test_contents_failed_candidate(self):
+        """Check a failed entry skips the rest and discards the candidate"""
+        self.conn.edit_config.side_effect = [
+            None,
+            ConnectionError("bad-element: vlan"),
+        ]
+        result = self.run_module({"contents": CONTENTS}, failed=True)
+        self.assertEqual(
+            result["contents"],
+            [
+                {"index": 0, "status": "applied"},
+                {"index": 1, "status": "failed", "msg": "bad-element: vlan"},
+                {"index": 2, "status": "skipped"},
+            ],
+        )
+        self.assertIn("contents entry 1", result["msg"])
+        self.assertFalse(result["changed"])
+        self.conn.discard_changes.assert_called_once_with()
+        self.conn.commit.assert_not_called()
+        self.conn.unlock.assert_called_once_with(target="candidate")
+
+    def test_contents_failed_running(self):
+        """Check the entries applied to running before a failure are
+        reported as a change
+        """
+        self.capabilities.return_value = capabilities(candidate=False)
+        self.conn.edit_config.side_effect = [
+            None,
+            ConnectionError("bad-element: vlan"),
+        ]
+        result = self.run_module({"contents": CONTENTS}, failed=True)
+        self.assertEqual(
+            [entry["status"] for entry in result["contents"]],
+            ["applied", "failed", "skipped"],
+        )
+        self.assertTrue(result["changed"])
+        self.conn.discard_changes.assert_not_called()
+        self.conn.unlock.assert_called_once_with(target="running")
+
+    def test_contents_first_failed_running(self):
+        """Check nothing is changed when the first entry fails on running"""
+        self.capabilities.return_value = capabilities(candidate=False)
+        self.conn.edit_config.side_effect = ConnectionError("bad-element")
+        result = self.run_module({"contents": CONTENTS}, failed=True)
+        self.assertEqual(
+            [entry["status"] for entry in result["contents"]],
+            ["failed", "skipped", "skipped"],
+        )
+        self.assertFalse(result["changed"])
+
+    def test_simulate_running_config_missing(self):
+        """Check a running_config that is neither XML nor a file fails"""
+        result = self.run_module(
+            {
+                "content": CONTENTS[0],
+                "simulate": True,
+                "running_config": "snapshots/missing.xml.gz",
+                "_ansible_check_mode": True,
+            },
+            failed=True,
+        )
+        self.assertEqual(
+            result["msg"],
+            "running_config file not found: snapshots/missing.xml.gz",
+        )
+        self.conn.get_config.assert_not_called()
+
+    def test_desired_state_filtered(self):
+        """Check the desired state of playbooks/nxos.yaml, read with a
+        filter for one interface, only sends the changed description
+        """
+        self.conn.get_config.side_effect = [
+            NXOS_REPLY,
+            NXOS_REPLY.replace("<descr>17</descr>", "<descr>42</descr>"),
+        ]
+        # the native netconf_get output for the filter, updated in place
+        system = {
+            "@xmlns": "http://cisco.com/ns/yang/cisco-nx-os-device",
+            "intf-items": {
+                "phys-items": {
+                    "PhysIf-list": {
+                        "id": "eth1/10",
+                        "descr": "42",
+                        "mtu": "1500",
+                    }
+                }
+            },
+        }
+        result = self.run_module(
+            {"desired_state": {"config": {"System": system}}}
+        )
+        self.assertTrue(result["changed"])
+        expected = (
+            '<config xmlns:nc="urn:ietf:params:xml:ns:netconf:base:1.0">'
+            '<System xmlns="http://cisco.com/ns/yang/cisco-nx-os-device">'
+            "<intf-items><phys-items><PhysIf-list><id>eth1/10</id>"
+            "<descr>42</descr></PhysIf-list></phys-items></intf-items>"
+            "</System></config>"
+        )
+        self.assertEqual(result["edit"], expected)
+        self.assertEqual(
+            self.conn.get_config.call_args_list[0][1],
+            {
+                "source": "candidate",
+                "filter": '<filter type="subtree"><System xmlns="http://'
+                'cisco.com/ns/yang/cisco-nx-os-device"/></filter>',
+            },
+        )
+        self.conn.edit_config.assert_called_once()
+        self.assertEqual(
+            self.conn.edit_config.call_args[1]["config"], expected
+        )
+        self.conn.commit.assert_called_once()
+
+    def test_reads_minimal(self):
+        """Check only the scope of the content is read, after from the
+        candidate datastore without a commit
+        """
+        self.conn.get_config.side_effect = [
+            REPLY,
+            REPLY.replace("r1", "r2"),
+        ]
+        result = self.run_module(
+            {"content": CONTENTS[0], "reads": "minimal", "commit": False}
+        )
+        self.assertTrue(result["changed"])
+        self.assertEqual(
+            [call[1] for call in self.conn.get_config.call_args_list],
+            [
+                {"source": "candidate", "filter": SYSTEM_FILTER},
+                {"source": "candidate", "filter": SYSTEM_FILTER},
+            ],
+        )
+        self.conn.commit.assert_not_called()
+
+    def test_reads_minimal_backup(self):
+        """Check the backup reply is narrowed to the scope and serves as
+        before, so only after is read
+        """
+        self.conn.get_config.return_value = REPLY.replace("r1", "r2")
+        with patch.object(
+            netconf_config,
+            "get_config",
+            return_value=fromstring(FULL_REPLY),
+        ) as get_config:
+            result = self.run_module(
+                {"content": CONTENTS[0], "reads": "minimal", "backup": True}
+            )
+        get_config.assert_called_once()
+        self.assertIn("<vlans>", result["__backup__"])
+        self.assertTrue(result["changed"])
+        self.conn.get_config.assert_called_once_with(
+            source="candidate", filter=SYSTEM_FILTER
+        )
+
+    def test_desired_state_check_mode(self):
+        """Check the edit decides changed without editing the device"""
+        result = self.run_module(
+            {
+                "desired_state": CONTENTS[0],
+                "_ansible_check_mode": True,
+            }
+        )
+        self.assertTrue(result["changed"])
+        self.assertIn("<hostname>r2</hostname>", result["edit"])
+        self.conn.get_config.assert_called_once_with(
+            source="candidate", filter=SYSTEM_FILTER
+        )
+        self.conn.edit_config.assert_not_called()
+        self.conn.discard_changes.assert_not_called()
+        self.conn.commit.assert_not_called()
+
+    def test_simulate(self):
+        """Check the edit is simulated from one read of running, without
+        locking or editing the device
+        """
+        result = self.run_module(
+            {
+                "content": CONTENTS[0],
+                "simulate": True,
+                "_ansible_check_mode": True,
+                "_ansible_diff": True,
+            }
+        )
+        self.assertTrue(result["changed"])
+        self.assertIn("r2", result["diff"]["after"])
+        self.conn.get_config.assert_called_once_with(
+            source="running", filter=SYSTEM_FILTER
+        )
+        self.conn.lock.assert_not_called()
+        self.conn.edit_config.assert_not_called()
+        self.conn.discard_changes.assert_not_called()
+        self.conn.unlock.assert_not_called()
+
+    def test_simulate_running_config(self):
+        """Check running_config replaces the read of running"""
+        result = self.run_module(
+            {
+                "content": CONTENTS[0],
+                "simulate": True,
+                "running_config": REPLY.replace("r1", "r2"),
+                "_ansible_check_mode": True,
+            }
+        )
+        self.assertFalse(result["changed"])
+        self.conn.get_config.assert_not_called()
+        self.conn.lock.assert_not_called()
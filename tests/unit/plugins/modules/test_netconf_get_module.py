@@ -0,0 +1,45 @@
+# (c) 2020 Ansible Project
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+from ansible_collections.ansible.netcommon.tests.unit.compat import unittest
+from ansible_collections.cidrblock.dev.plugins.modules.netconf_get import (
+    format_response,
+    fromstring,
+)
+
+REPLY = """<data xmlns="urn:ietf:params:xml:ns:netconf:base:1.0">
+  <system xmlns="urn:system" xmlns:p="urn:p" p:origin="intended">
+    <hostname>r1</hostname>
+  </system>
+</data>"""
+
+
+class TestNetconfGet(unittest.TestCase):
+    def test_format_response_xml(self):
+        """Check the xml display drops the namespaces and stdout keeps them"""
+        xml_resp, output = format_response(fromstring(REPLY), "xml", False)
+        self.assertEqual(xml_resp, REPLY)
+        self.assertEqual(
+            output,
+            '<?xml version="1.0" encoding="UTF-8"?><data>'
+            '<system origin="intended"><hostname>r1</hostname></system>'
+            "</data>",
+        )
+
+    def test_format_response_pretty(self):
+        """Check strip_namespaces applies to the pretty display"""
+        xml_resp, output = format_response(
+            fromstring(REPLY), "pretty", True, stdout=False
+        )
+        self.assertIsNone(xml_resp)
+        self.assertEqual(
+            output,
+            '<data>\n  <system origin="intended">\n'
+            "    <hostname>r1</hostname>\n  </system>\n</data>\n",
+        )
+        _xml_resp, output = format_response(fromstring(REPLY), "pretty", False)
+        self.assertIn('<system xmlns="urn:system"', output)